@@ -1,9 +1,28 @@
-from ultralytics import YOLO
 import cv2
+import numpy as np
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from inference_worker import InferenceWorker, RemoteInferenceWorker, connect
 
-def auto_annotate_faces(image_dir, output_label_dir, model_path='yolov8n-face.pt', conf_threshold=0.5):
+def _load_batches(image_files, batch_size, batch_queue):
+    """Decode images on a thread pool and queue them batch by batch"""
+    try:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for start in range(0, len(image_files), batch_size):
+                paths = image_files[start:start + batch_size]
+                imgs = list(executor.map(lambda p: cv2.imread(str(p)), paths))
+                batch_queue.put((paths, imgs))
+    except Exception as e:
+        print(f"Error loading images, stopping early: {e}")
+    finally:
+        # Always end the stream, or the annotation loop would wait forever
+        batch_queue.put(None)
+
+def auto_annotate_faces(image_dir, output_label_dir, model_path='yolov8n-face.pt', conf_threshold=0.5,
+                        batch_size=16, worker_port=None, export_format=None):
     """
     Automatically annotate faces in images using YOLOv8
     
@@ -12,59 +31,89 @@ def auto_annotate_faces(image_dir, output_label_dir, model_path='yolov8n-face.pt
         output_label_dir: Directory to save YOLO format labels
         model_path: Path to YOLO model for detection
         conf_threshold: Confidence threshold for detections
+        batch_size: Number of images passed to the model per inference call
+        worker_port: Port of a running inference_worker.py to reuse instead of loading the model
+        export_format: Run a fixed 640 input export of the model (e.g. "openvino") instead of PyTorch
     """
     os.makedirs(output_label_dir, exist_ok=True)
     
-    print(f"Loading model: {model_path}")
-    try:
-        model = YOLO(model_path)
-    except:
-        print(f"Could not load {model_path}, using yolov8n.pt instead")
-        model = YOLO('yolov8n.pt')
+    worker = connect(port=worker_port) if worker_port else None
+    if worker is not None:
+        print(f"Using inference worker on port {worker_port}")
+        precision = "set by inference worker"
+    else:
+        if worker_port:
+            print(f"No inference worker on port {worker_port}, loading model locally")
+        print(f"Loading model: {model_path}")
+        try:
+            worker = InferenceWorker(model_path, export_format, batch=batch_size)
+        except:
+            print(f"Could not load {model_path}, using yolov8n.pt instead")
+            worker = InferenceWorker('yolov8n.pt', export_format, batch=batch_size)
+        precision = 'FP16' if worker.use_half else 'FP32'
     
-    image_extensions = ['.jpg', '.jpeg', '.png', '.bmp']
-    image_files = []
-    for ext in image_extensions:
-        image_files.extend(Path(image_dir).glob(f'*{ext}'))
+    image_extensions = {'.jpg', '.jpeg', '.png', '.bmp'}
+    with os.scandir(image_dir) as entries:
+        image_files = [Path(entry.path) for entry in entries
+                       if entry.is_file() and os.path.splitext(entry.name)[1].lower() in image_extensions]
     
     print(f"\nFound {len(image_files)} images in {image_dir}")
     print(f"Annotating with confidence threshold: {conf_threshold}")
+    print(f"Precision: {precision}")
     print(f"Saving labels to: {output_label_dir}\n")
     
     annotated_count = 0
     no_detection_count = 0
     
-    for img_path in image_files:
-        img = cv2.imread(str(img_path))
-        if img is None:
-            print(f"Could not read: {img_path}")
-            continue
+    # Decode the next batch while the current one is on the model
+    batch_queue = queue.Queue(maxsize=2)
+    loader = threading.Thread(target=_load_batches, args=(image_files, batch_size, batch_queue), daemon=True)
+    loader.start()
+    
+    while True:
+        item = batch_queue.get()
+        if item is None:
+            break
         
-        height, width = img.shape[:2]
-        results = model(img, conf=conf_threshold, verbose=False)
-        boxes = results[0].boxes
+        batch_paths = []
+        batch_imgs = []
+        for img_path, img in zip(*item):
+            if img is None:
+                print(f"Could not read: {img_path}")
+                continue
+            batch_paths.append(img_path)
+            batch_imgs.append(img)
         
-        if len(boxes) == 0:
-            no_detection_count += 1
-            print(f"No face detected: {img_path.name}")
+        if not batch_imgs:
             continue
         
-        label_file = os.path.join(output_label_dir, img_path.stem + '.txt')
-        
-        with open(label_file, 'w') as f:
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                
-                x_center = ((x1 + x2) / 2) / width
-                y_center = ((y1 + y2) / 2) / height
-                w = (x2 - x1) / width
-                h = (y2 - y1) / height
-                
-                f.write(f"0 {x_center:.6f} {y_center:.6f} {w:.6f} {h:.6f}\n")
+        batch_boxes = worker.predict(batch_imgs, conf=conf_threshold, imgsz=640)
         
-        annotated_count += 1
-        if annotated_count % 10 == 0:
-            print(f"Annotated: {annotated_count}/{len(image_files)}")
+        for img_path, img, xyxy in zip(batch_paths, batch_imgs, batch_boxes):
+            height, width = img.shape[:2]
+            
+            if len(xyxy) == 0:
+                no_detection_count += 1
+                print(f"No face detected: {img_path.name}")
+                continue
+            
+            label_file = Path(output_label_dir) / (img_path.stem + '.txt')
+            
+            labels = np.column_stack((
+                (xyxy[:, 0] + xyxy[:, 2]) * 0.5 / width,
+                (xyxy[:, 1] + xyxy[:, 3]) * 0.5 / height,
+                (xyxy[:, 2] - xyxy[:, 0]) / width,
+                (xyxy[:, 3] - xyxy[:, 1]) / height
+            ))
+            lines = ''.join('0 %.6f %.6f %.6f %.6f\n' % tuple(row) for row in labels)
+            label_file.write_bytes(lines.encode())
+            
+            annotated_count += 1
+            if annotated_count % 10 == 0:
+                print(f"Annotated: {annotated_count}/{len(image_files)}")
+    
+    if isinstance(worker, RemoteInferenceWorker):
+        worker.close()
     
     print(f"\n{'='*60}")
     print(f"Auto-annotation complete!")
@@ -90,7 +139,14 @@ if __name__ == "__main__":
                         help='YOLO model to use for detection')
     parser.add_argument('--conf', type=float, default=0.3,
                         help='Confidence threshold')
+    parser.add_argument('--batch', type=int, default=16,
+                        help='Images per inference batch')
+    parser.add_argument('--worker-port', type=int, default=None,
+                        help='Reuse a running inference_worker.py on this port')
+    parser.add_argument('--export', type=str, default=None, choices=['openvino', 'engine', 'onnx'],
+                        help='Export the model once for 640 input and annotate with the export')
     
     args = parser.parse_args()
     
-    auto_annotate_faces(args.images, args.labels, args.model, args.conf)
\ No newline at end of file
+    auto_annotate_faces(args.images, args.labels, args.model, args.conf, args.batch, args.worker_port,
+                        args.export)
\ No newline at end of file
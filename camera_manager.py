@@ -4,98 +4,269 @@ Handles camera selection and switching
 """
 
 import cv2
+import http.client
 import logging
+import numpy as np
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, List
+from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+# libjpeg-turbo's SIMD decoder is much faster than OpenCV's stock libjpeg
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    turbo_jpeg = None
+
+class MJPEGCapture:
+    """
+    VideoCapture stand-in for HTTP MJPEG streams (e.g. ESP32-CAM /stream)
+    
+    JPEG payloads are cut out of the multipart body by their SOI/EOI markers,
+    so grab() is only a socket read; frames are decoded with libjpeg-turbo
+    when retrieve() asks for them.
+    """
+    
+    def __init__(self, url, timeout=5):
+        self._buffer = bytearray()
+        self._jpeg = None
+        self._size = (0, 0)
+        self._conn = None
+        self._response = None
+        
+        parsed = urlparse(url)
+        path = (parsed.path or '/') + (f'?{parsed.query}' if parsed.query else '')
+        conn_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+        try:
+            self._conn = conn_class(parsed.hostname, parsed.port, timeout=timeout)
+            self._conn.request('GET', path)
+            self._response = self._conn.getresponse()
+        except (OSError, http.client.HTTPException):
+            self.release()
+            return
+        
+        if self._response.status != 200 or 'multipart' not in self._response.getheader('Content-Type', ''):
+            self.release()
+    
+    def isOpened(self):
+        return self._response is not None
+    
+    def grab(self):
+        """Read up to the end of the next JPEG in the stream"""
+        buf = self._buffer
+        while self._response is not None:
+            start = buf.find(b'\xff\xd8')
+            if start >= 0:
+                end = buf.find(b'\xff\xd9', start + 2)
+                if end >= 0:
+                    self._jpeg = bytes(buf[start:end + 2])
+                    del buf[:end + 2]
+                    return True
+                del buf[:start]
+            else:
+                # Keep a trailing 0xFF in case the marker is split across reads
+                del buf[:-1]
+            
+            try:
+                chunk = self._response.read1(65536)
+            except (OSError, http.client.HTTPException):
+                chunk = b''
+            if not chunk:
+                self.release()
+                break
+            buf += chunk
+        return False
+    
+    def retrieve(self):
+        """Decode the last grabbed JPEG to a BGR frame"""
+        if self._jpeg is None:
+            return False, None
+        try:
+            if turbo_jpeg is not None:
+                frame = turbo_jpeg.decode(self._jpeg, pixel_format=TJPF_BGR)
+            else:
+                frame = cv2.imdecode(np.frombuffer(self._jpeg, np.uint8), cv2.IMREAD_COLOR)
+        except (OSError, ValueError):
+            frame = None
+        if frame is None:
+            return False, None
+        self._size = (frame.shape[1], frame.shape[0])
+        return True, frame
+    
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+    
+    def get(self, prop):
+        """Frame size once a frame has been decoded; other properties are unknown (0)"""
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self._size[0]
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self._size[1]
+        return 0
+    
+    def set(self, prop, value):
+        # Nothing is buffered beyond the frame being parsed
+        return False
+    
+    def release(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+        self._response = None
+
+def open_capture(source):
+    """Open a VideoCapture that keeps only the newest frame buffered"""
+    if isinstance(source, str):
+        if turbo_jpeg is not None and source.startswith(('http://', 'https://')):
+            # Plain MJPEG over HTTP: parse it ourselves and decode with libjpeg-turbo
+            cap = MJPEGCapture(source)
+            if cap.isOpened():
+                return cap
+        cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG)
+    else:
+        cap = cv2.VideoCapture(source)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+def probe_stream_host(url: str, timeout: float = 2) -> bool:
+    """Check that the host behind a stream URL accepts TCP connections"""
+    parsed = urlparse(url)
+    if not parsed.hostname:
+        return False
+    default_ports = {"http": 80, "https": 443, "rtsp": 554}
+    port = parsed.port or default_ports.get(parsed.scheme, 80)
+    try:
+        with socket.create_connection((parsed.hostname, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
 class CameraManager:
     def __init__(self):
         self.current_camera = None
         self.current_source = None
         self.available_cameras = []
-        self.detect_cameras()
+        
+        # Grab thread state: frames are grabbed continuously but only
+        # decoded when a reader asks for one
+        self._grab_thread = None
+        self._grab_stop = threading.Event()
+        self._frame_cond = threading.Condition()
+        self._frame_wanted = False
+        self._frame_seq = 0
+        self._latest_frame = None
+        
+        # Webcam probing is slow, so it runs on first use rather than here
+        self.cameras_detected = False
+    
+    def _probe_index(self, idx: int) -> Optional[Dict]:
+        """Open a webcam index and describe it if it delivers frames"""
+        cap = open_capture(idx)
+        try:
+            if not cap.isOpened():
+                return None
+            ret, frame = cap.read()
+            if not ret:
+                return None
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            return {
+                "id": f"webcam_{idx}",
+                "name": f"Webcam ({idx})",
+                "type": "webcam",
+                "source": idx,
+                "resolution": f"{width}x{height}"
+            }
+        finally:
+            cap.release()
     
     def detect_cameras(self):
-        """Detect available cameras"""
-        self.available_cameras = []
+        """Detect available webcams, keeping any added IP cameras"""
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            webcams = [c for c in executor.map(self._probe_index, range(3)) if c is not None]
         
-        for idx in range(3):
-            cap = cv2.VideoCapture(idx)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                if ret:
-                    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                    
-                    self.available_cameras.append({
-                        "id": f"webcam_{idx}",
-                        "name": f"Webcam ({idx})",
-                        "type": "webcam",
-                        "source": idx,
-                        "resolution": f"{width}x{height}"
-                    })
-                cap.release()
-        
-        logger.info(f"Detected {len(self.available_cameras)} cameras")
+        ip_cameras = [c for c in self.available_cameras if c["type"] != "webcam"]
+        self.available_cameras = webcams + ip_cameras
+        self.cameras_detected = True
+        
+        logger.info(f"Detected {len(webcams)} cameras")
+    
+    def _find_camera(self, camera_id: str) -> Optional[Dict]:
+        """Look up a camera by ID, probing webcams first if not done yet"""
+        camera = next((c for c in self.available_cameras if c["id"] == camera_id), None)
+        if camera is None and not self.cameras_detected:
+            self.detect_cameras()
+            camera = next((c for c in self.available_cameras if c["id"] == camera_id), None)
+        return camera
     
     def add_ip_camera(self, name: str, url: str):
+        """Register an IP camera after a quick reachability check"""
         camera_id = name.lower().replace(" ", "_")
         
-        cap = cv2.VideoCapture(url)
-        if cap.isOpened():
-            ret, frame = cap.read()
-            if ret:
-                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                
-                camera_info = {
-                    "id": camera_id,
-                    "name": name,
-                    "type": "ip",
-                    "source": url,
-                    "resolution": f"{width}x{height}"
-                }
-                
-                existing = next((c for c in self.available_cameras if c["id"] == camera_id), None)
-                if existing:
-                    idx = self.available_cameras.index(existing)
-                    self.available_cameras[idx] = camera_info
-                else:
-                    self.available_cameras.append(camera_info)
-                
-                cap.release()
-                logger.info(f"Added IP camera: {name} ({url})")
-                return {"status": "success", "camera": camera_info}
-            cap.release()
+        # A TCP connect is enough to reject bad hosts; the stream itself is
+        # only opened when the camera is selected
+        if not probe_stream_host(url):
+            logger.error(f"Failed to connect to IP camera: {url}")
+            return {"error": "Failed to connect to camera"}
         
-        logger.error(f"Failed to connect to IP camera: {url}")
-        return {"error": "Failed to connect to camera"}
+        camera_info = {
+            "id": camera_id,
+            "name": name,
+            "type": "ip",
+            "source": url,
+            "resolution": "unknown"
+        }
+        
+        existing = next((c for c in self.available_cameras if c["id"] == camera_id), None)
+        if existing:
+            idx = self.available_cameras.index(existing)
+            self.available_cameras[idx] = camera_info
+        else:
+            self.available_cameras.append(camera_info)
+        
+        logger.info(f"Added IP camera: {name} ({url})")
+        return {"status": "success", "camera": camera_info}
     
     def get_cameras(self) -> List[Dict]:
         """Get list of available cameras"""
+        if not self.cameras_detected:
+            self.detect_cameras()
         return self.available_cameras
     
     def select_camera(self, camera_id: str):
         """Select a camera by ID"""
-        camera = next((c for c in self.available_cameras if c["id"] == camera_id), None)
+        camera = self._find_camera(camera_id)
         
         if not camera:
             return {"error": "Camera not found"}
         
         if self.current_camera is not None:
+            self._stop_grabber()
             self.current_camera.release()
             self.current_camera = None
         
         source = camera["source"]
-        cap = cv2.VideoCapture(source)
+        cap = open_capture(source)
         
         if not cap.isOpened():
             logger.error(f"Failed to open camera: {camera_id}")
             return {"error": "Failed to open camera"}
         
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if width and height:
+            camera["resolution"] = f"{width}x{height}"
+        
         self.current_camera = cap
         self.current_source = camera
+        self._start_grabber()
         
         logger.info(f"Selected camera: {camera['name']}")
         return {"status": "success", "camera": camera}
@@ -104,31 +275,85 @@ class CameraManager:
         """Get currently selected camera"""
         return self.current_source
     
+    def _start_grabber(self):
+        """Start the background grab loop for the current camera"""
+        self._grab_stop = threading.Event()
+        self._grab_thread = threading.Thread(
+            target=self._grab_loop,
+            args=(self.current_camera, self._grab_stop),
+            daemon=True
+        )
+        self._grab_thread.start()
+    
+    def _stop_grabber(self):
+        """Stop the grab loop and wake any waiting readers"""
+        if self._grab_thread is None:
+            return
+        self._grab_stop.set()
+        self._grab_thread.join(timeout=2)
+        self._grab_thread = None
+        with self._frame_cond:
+            self._latest_frame = None
+            self._frame_seq += 1
+            self._frame_cond.notify_all()
+    
+    def _grab_loop(self, cap, stop):
+        """Keep the camera drained so reads always return the newest frame"""
+        while not stop.is_set():
+            ok = cap.grab()
+            
+            with self._frame_cond:
+                wanted = self._frame_wanted
+            
+            frame = None
+            if ok and wanted:
+                ok, frame = cap.retrieve()
+            
+            if wanted or not ok:
+                with self._frame_cond:
+                    self._latest_frame = frame if ok else None
+                    self._frame_wanted = False
+                    self._frame_seq += 1
+                    self._frame_cond.notify_all()
+            
+            if not ok:
+                time.sleep(0.1)
+    
     def read_frame(self):
-        """Read frame from current camera"""
+        """Read newest frame from current camera"""
         if self.current_camera is None:
             return None, None
         
-        ret, frame = self.current_camera.read()
-        if ret:
-            return True, frame
+        with self._frame_cond:
+            self._frame_wanted = True
+            seq = self._frame_seq
+            if self._frame_cond.wait_for(lambda: self._frame_seq != seq, timeout=2):
+                frame = self._latest_frame
+            else:
+                frame = None
+        
+        if frame is not None:
+            # _latest_frame itself is never handed out, so no reader can draw into it
+            # while another copies it; the grabber only ever replaces it
+            return True, frame.copy()
         return False, None
     
     def release(self):
         """Release current camera"""
         if self.current_camera is not None:
+            self._stop_grabber()
             self.current_camera.release()
             self.current_camera = None
             self.current_source = None
     
     def test_camera(self, camera_id: str):
         """Test if a camera is accessible"""
-        camera = next((c for c in self.available_cameras if c["id"] == camera_id), None)
+        camera = self._find_camera(camera_id)
         
         if not camera:
             return {"error": "Camera not found"}
         
-        cap = cv2.VideoCapture(camera["source"])
+        cap = open_capture(camera["source"])
         if cap.isOpened():
             ret, frame = cap.read()
             cap.release()
@@ -4,10 +4,50 @@ Captures images from webcam to create a training dataset
 """
 
 import cv2
+import numpy as np
 import os
-from datetime import datetime
+import queue
+import threading
 import time
 
+class FramePool:
+    """Fixed set of frame buffers handed to the writer thread and returned after saving"""
+    
+    def __init__(self, size, shape, dtype=np.uint8):
+        # LIFO so the most recently returned (cache-warm) buffer is reused first
+        self._free = queue.LifoQueue()
+        for _ in range(size):
+            self._free.put(np.empty(shape, dtype))
+    
+    def acquire(self):
+        """Take a free buffer, waiting for the writer to return one if all are in use"""
+        return self._free.get()
+    
+    def release(self, buffer):
+        """Return a buffer once its contents are no longer needed"""
+        self._free.put(buffer)
+
+def _write_images(write_queue, pool):
+    """Encode and save queued frames off the capture loop"""
+    while True:
+        frame, filepath = write_queue.get()
+        try:
+            # Encode to memory, then hand the buffer back before the disk write
+            try:
+                ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+            finally:
+                pool.release(frame)
+            if ok:
+                with open(filepath, 'wb') as f:
+                    f.write(jpeg)
+            else:
+                print(f"Error: Could not encode {filepath}")
+        except Exception as e:
+            print(f"Error: Could not save {filepath}: {e}")
+        finally:
+            # Always mark the frame done, or the final write_queue.join() never returns
+            write_queue.task_done()
+
 def collect_face_data(output_dir='dataset/my_face', num_images=200, capture_interval=0.5):
     """
     Collect face images from webcam for training
@@ -40,24 +80,52 @@ def collect_face_data(output_dir='dataset/my_face', num_images=200, capture_inte
     print("Press 'q' to quit early")
     print(f"{'='*60}\n")
     
+    ret, frame = cap.read()
+    if not ret:
+        print("Error: Cannot read frame")
+        cap.release()
+        return
+    
+    write_queue = queue.Queue(maxsize=32)
+    # Enough buffers for a full queue plus the one being written, so acquire() never waits
+    # longer than put() would; capture copies go through these instead of fresh allocations
+    pool = FramePool(write_queue.maxsize + 2, frame.shape, frame.dtype)
+    threading.Thread(target=_write_images, args=(write_queue, pool), daemon=True).start()
+    
+    filepath_prefix = os.path.join(output_dir, "face_")
     captured = 0
     capturing = False
     last_capture_time = 0
     
     while captured < num_images:
-        ret, frame = cap.read()
+        # Decode into the previous frame's buffer instead of allocating a new one
+        ret, frame = cap.read(frame)
         
         if not ret:
             print("Error: Cannot read frame")
             break
         
-        display_frame = frame.copy()
+        # Queue the raw frame before overlays are drawn on it
+        current_time = time.time()
+        if capturing and (current_time - last_capture_time) >= capture_interval:
+            filepath = f"{filepath_prefix}{captured:04d}_{time.time_ns()}.jpg"
+            
+            # Copy because overlays are drawn on this frame below
+            buffer = pool.acquire()
+            if buffer.shape != frame.shape:
+                buffer = np.empty_like(frame)
+            np.copyto(buffer, frame)
+            write_queue.put((buffer, filepath))
+            captured += 1
+            last_capture_time = current_time
+            print(f"Captured: {captured}/{num_images} - {os.path.basename(filepath)}")
+        
         status = "CAPTURING" if capturing else "PAUSED - Press SPACE to start"
         color = (0, 255, 0) if capturing else (0, 165, 255)
         
-        cv2.putText(display_frame, status, (10, 30), 
+        cv2.putText(frame, status, (10, 30), 
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-        cv2.putText(display_frame, f"Captured: {captured}/{num_images}", (10, 60),
+        cv2.putText(frame, f"Captured: {captured}/{num_images}", (10, 60),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
         height, width = frame.shape[:2]
@@ -66,22 +134,12 @@ def collect_face_data(output_dir='dataset/my_face', num_images=200, capture_inte
         y1 = (height - rect_size) // 2
         x2 = x1 + rect_size
         y2 = y1 + rect_size
-        cv2.rectangle(display_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-        cv2.putText(display_frame, "Position face here", (x1, y1 - 10),
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, "Position face here", (x1, y1 - 10),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
         
-        cv2.imshow('Face Data Collection', display_frame)
+        cv2.imshow('Face Data Collection', frame)
         
-        current_time = time.time()
-        if capturing and (current_time - last_capture_time) >= capture_interval:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-            filename = f"face_{captured:04d}_{timestamp}.jpg"
-            filepath = os.path.join(output_dir, filename)
-            
-            cv2.imwrite(filepath, frame)
-            captured += 1
-            last_capture_time = current_time
-            print(f"Captured: {captured}/{num_images} - {filename}")
         key = cv2.waitKey(1) & 0xFF
         if key == ord('q'):
             print("\nCapture stopped by user")
@@ -93,6 +151,7 @@ def collect_face_data(output_dir='dataset/my_face', num_images=200, capture_inte
     
     cap.release()
     cv2.destroyAllWindows()
+    write_queue.join()
     
     print(f"\n{'='*60}")
     print(f"Data collection complete!")
@@ -20,6 +20,9 @@ ESP32_BUZZER_STATUS_URL = f"http://{ESP32_BUZZER_IP}/status"
 
 PERSON_DETECTOR_MODEL = "yolov8n.pt"
 FACE_RECOGNITION_MODEL = r".\runs\face_detection\my_face_model5\weights\best.pt"
+MODEL_EXPORT_FORMAT = None  # None (PyTorch), "openvino" (CPU) or "engine" (TensorRT)
+MODEL_EXPORT_INT8 = False  # Quantize the export to INT8 (calibrated once at export time)
+FACE_CALIBRATION_DATA = "face_dataset.yaml"  # INT8 calibration images for the face model
 
 # ============================================
 # DETECTION SETTINGS
@@ -32,13 +35,15 @@ ALERT_COOLDOWN = 30
 BUZZER_PATTERN = 1
 FRAME_SKIP = 5
 IMAGE_SIZE = 640
+PERSON_IMAGE_SIZE = 320  # Person pass input size; ~4x fewer pixels than 640 for a 640x480 feed
+FACE_BATCH_SIZE = 8  # Most person crops per face-model call (exports are built for this batch)
 
 # ============================================
 # STORAGE SETTINGS
 # ============================================
 
 IMAGES_DIR = "security_images"
-LOGS_FILE = "security_log.json"
+LOGS_FILE = "security_log.jsonl"
 SAVE_IMAGES = True
 DUPLICATE_COOLDOWN_HOURS = 1
 HASH_SIMILARITY_THRESHOLD = 5
@@ -50,6 +55,8 @@ HASH_SIMILARITY_THRESHOLD = 5
 HOST = "0.0.0.0"
 PORT = 8000
 DEBUG = False
+PREVIEW_W = 640  # Streams are downscaled to fit within PREVIEW_W x PREVIEW_H
+PREVIEW_H = 480
 CORS_ORIGINS = [
     "http://localhost:8000",
     "http://127.0.0.1:8000",
@@ -82,4 +89,9 @@ ENABLE_STATISTICS = True
 TRACK_MAX_DISTANCE = 100
 TRACK_TIMEOUT = 30
 MIN_PERSON_AREA_PERCENT = 2
-ESP32_STATUS_CHECK_INTERVAL = 60
\ No newline at end of file
+ESP32_STATUS_CHECK_INTERVAL = 60
+ESP32_STATUS_CACHE_TTL = 2
+TRAINING_CACHE_TTL = 5
+IMAGE_LIST_SETTLE_SECONDS = 5  # Don't cache image listings holding a file this new (it may still be being written)
+TRAINING_CAPTURE_FORMAT = "jpg"  # "jpg", "bmp" (no encode cost, ~10x larger) or "png" (RLE)
+TRAINING_DEDUP_DISTANCE = 5  # Skip captures within this many dHash bits of the last kept one (0 = off)
\ No newline at end of file
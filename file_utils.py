@@ -0,0 +1,20 @@
+"""
+File Utilities
+Filesystem helpers shared by the dataset preparation code
+"""
+
+import os
+import shutil
+
+def link_or_copy(src, dst):
+    """Place src at dst as a hardlink (no bytes copied), copying only where links aren't supported"""
+    try:
+        # Left over from an earlier run; may already be a link to src
+        os.remove(dst)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Different filesystem, FAT drives, ...
+        shutil.copy2(src, dst)
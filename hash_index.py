@@ -0,0 +1,72 @@
+"""
+Hash Index
+BK-tree for finding perceptual hashes within a Hamming distance without scanning them all
+"""
+
+
+if hasattr(int, 'bit_count'):
+    def hamming_distance(a, b):
+        """Number of differing bits between two integer hashes (POPCNT on Python 3.10+)"""
+        return (a ^ b).bit_count()
+else:
+    def hamming_distance(a, b):
+        """Number of differing bits between two integer hashes"""
+        return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes
+
+    Each child edge is labelled with its distance to the parent, so a radius
+    query only descends into edges within [d - radius, d + radius] of the
+    query's distance to that node (triangle inequality).
+    """
+
+    def __init__(self, distance=hamming_distance, items=()):
+        self.distance = distance
+        self.root = None
+        self.size = 0
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        """Insert item (inserting an item already in the tree is a no-op)"""
+        if self.root is None:
+            self.root = (item, {})
+            self.size = 1
+            return
+
+        node_item, children = self.root
+        while True:
+            d = self.distance(item, node_item)
+            if d == 0:
+                return
+            child = children.get(d)
+            if child is None:
+                children[d] = (item, {})
+                self.size += 1
+                return
+            node_item, children = child
+
+    def find(self, item, radius):
+        """Return sorted (distance, item) pairs for every item within radius of item"""
+        if self.root is None:
+            return []
+
+        found = []
+        pending = [self.root]
+        while pending:
+            node_item, children = pending.pop()
+            d = self.distance(item, node_item)
+            if d <= radius:
+                found.append((d, node_item))
+            for edge, child in children.items():
+                if d - radius <= edge <= d + radius:
+                    pending.append(child)
+
+        found.sort()
+        return found
+
+    def __len__(self):
+        return self.size
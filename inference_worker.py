@@ -0,0 +1,104 @@
+"""
+Inference Worker
+Keeps a YOLO model loaded and serves predictions to CLI tools over a local socket
+"""
+
+from multiprocessing.connection import Listener, Client
+from model_utils import load_yolo, predict_args
+
+DEFAULT_HOST = 'localhost'
+DEFAULT_PORT = 6001
+AUTHKEY = b'face-inference'
+
+class InferenceWorker:
+    def __init__(self, model_path='yolov8n.pt', export_format=None, imgsz=640, batch=16):
+        """
+        Load a YOLO model once so it can serve many prediction requests
+
+        Args:
+            model_path: Path to YOLO model weights
+            export_format: Optional fixed-shape export to run through (e.g. "openvino")
+            imgsz: Model input size, used when exporting
+            batch: Largest batch per forward pass; bigger requests are split
+        """
+        self.model_path = model_path
+        self.batch = batch
+        self.model = load_yolo(model_path, export_format, imgsz, batch=batch)
+
+        # FP16 halves memory traffic on GPU; CPU inference stays FP32
+        self.predict_args = predict_args()
+        self.use_half = bool(self.predict_args)
+
+    def predict(self, imgs, conf=0.5, imgsz=640):
+        """Run batched inference and return an (N, 4) xyxy array per image"""
+        boxes = []
+        # Exports only accept up to self.batch images per call
+        for start in range(0, len(imgs), self.batch):
+            results = self.model(imgs[start:start + self.batch], conf=conf, verbose=False, imgsz=imgsz,
+                                 **self.predict_args)
+            boxes.extend(result.boxes.xyxy.cpu().numpy() for result in results)
+        return boxes
+
+    def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Answer prediction requests from clients until interrupted"""
+        with Listener((host, port), authkey=AUTHKEY) as listener:
+            print(f"Inference worker ready on {host}:{port} ({self.model_path})")
+            while True:
+                with listener.accept() as conn:
+                    while True:
+                        try:
+                            request = conn.recv()
+                        except EOFError:
+                            break
+                        # A bad request must not take the worker down; the client re-raises the error
+                        try:
+                            response = self.predict(request['imgs'], request['conf'], request['imgsz'])
+                        except Exception as e:
+                            print(f"Prediction failed: {type(e).__name__}: {e}")
+                            response = RuntimeError(f"Inference worker error: {type(e).__name__}: {e}")
+                        conn.send(response)
+
+class RemoteInferenceWorker:
+    """Client side of InferenceWorker with the same predict() interface"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def predict(self, imgs, conf=0.5, imgsz=640):
+        self.conn.send({'imgs': imgs, 'conf': conf, 'imgsz': imgsz})
+        response = self.conn.recv()
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def close(self):
+        self.conn.close()
+
+def connect(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Connect to a running worker, or return None if none is listening"""
+    try:
+        return RemoteInferenceWorker(Client((host, port), authkey=AUTHKEY))
+    except OSError:
+        return None
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Persistent YOLO inference worker')
+    parser.add_argument('--model', type=str, default='yolov8n.pt',
+                        help='YOLO model to keep loaded')
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST,
+                        help='Address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help='Port to listen on')
+    parser.add_argument('--export', type=str, default=None, choices=['openvino', 'engine', 'onnx'],
+                        help='Export the model once to this format and serve the export')
+    parser.add_argument('--batch', type=int, default=16,
+                        help='Largest batch per forward pass (exports are built for it)')
+
+    args = parser.parse_args()
+
+    try:
+        InferenceWorker(args.model, args.export, batch=max(1, args.batch)).serve_forever(args.host, args.port)
+    except KeyboardInterrupt:
+        print("\nInference worker stopped")
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""
+Security Log I/O
+Reads and rewrites the detection log: JSON Lines, or the legacy JSON array it replaced
+"""
+
+import mmap
+import os
+import ijson
+import orjson
+
+def resolve_log_file(log_file):
+    """Prefer the JSON Lines log next to log_file over a legacy JSON array of the same name"""
+    jsonl_file = os.path.splitext(log_file)[0] + '.jsonl'
+    return jsonl_file if os.path.exists(jsonl_file) else log_file
+
+def is_jsonl(log_file):
+    """Whether log_file holds one entry per line (rather than one JSON array)"""
+    return log_file.endswith('.jsonl')
+
+def read_log(log_file):
+    """Load every log entry into a list ([] when there is no log)"""
+    if is_jsonl(log_file):
+        return list(iter_log(log_file))
+    if not os.path.exists(log_file) or os.path.getsize(log_file) == 0:
+        return []
+    # Map the file and parse straight from the page cache
+    with open(log_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+def iter_log(log_file):
+    """Stream log entries one at a time without building the full list"""
+    if not os.path.exists(log_file) or os.path.getsize(log_file) == 0:
+        return
+    with open(log_file, 'rb') as f:
+        if is_jsonl(log_file):
+            for line in f:
+                if line.strip():
+                    yield orjson.loads(line)
+        else:
+            yield from ijson.items(f, 'item', use_float=True)
+
+def write_log(log_file, entries):
+    """Replace the log with entries via a sibling file, so a crash never leaves it truncated"""
+    tmp_file = log_file + '.tmp'
+    with open(tmp_file, 'wb', buffering=1 << 16) as f:
+        if is_jsonl(log_file):
+            for entry in entries:
+                f.write(orjson.dumps(entry) + b'\n')
+        else:
+            f.write(orjson.dumps(entries, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_file, log_file)
@@ -4,7 +4,7 @@ Integrates ESP32-CAM, ESP32 Buzzer, and AI Detection
 """
 
 from fastapi import FastAPI, WebSocket, HTTPException, BackgroundTasks
-from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
@@ -14,11 +14,14 @@ from typing import Optional, List
 import uvicorn
 import asyncio
 import json
+import orjson
 import os
 from datetime import datetime, timedelta
 import cv2
-import requests
+import httpx
+import time
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
 import config
@@ -32,6 +35,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# libjpeg-turbo's SIMD encoder is much faster than cv2.imencode; fall back if it's missing
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420, TJPF_BGR
+    turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    turbo_jpeg = None
+    logger.info("PyTurboJPEG not available, streaming with cv2.imencode")
+
 # ============================================
 # FASTAPI APP INITIALIZATION
 # ============================================
@@ -39,7 +50,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Smart Security System",
     description="AI-powered security system with ESP32 integration",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -65,11 +77,30 @@ if os.path.exists("static"):
 security_system: Optional[SecuritySystem] = None
 system_active = False
 connected_websockets = []
-training_manager = TrainingManager()
+http_client: Optional[httpx.AsyncClient] = None
+esp32_status_cache = {}
+image_list_cache = {}
+training_cache = {}
+stats_message: Optional[str] = None
+stats_updated = asyncio.Event()
+training_manager = TrainingManager(
+    capture_format=config.TRAINING_CAPTURE_FORMAT,
+    dedup_distance=config.TRAINING_DEDUP_DISTANCE
+)
 camera_manager = CameraManager()
 camera_manager.add_ip_camera("ESP32-CAM", config.ESP32_CAM_STREAM_URL)
 camera_manager.select_camera("esp32-cam")
 
+def _encode_placeholder(text: Optional[str] = None) -> bytes:
+    """Encode a blank 640x480 frame once so streams can reuse the JPEG"""
+    blank = np.zeros((480, 640, 3), dtype=np.uint8)
+    if text:
+        cv2.putText(blank, text, (150, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    return cv2.imencode('.jpg', blank)[1].tobytes()
+
+BLANK_FRAME_BYTES = _encode_placeholder()
+NO_CAMERA_FRAME_BYTES = _encode_placeholder("No Camera Selected")
+
 # ============================================
 # PYDANTIC MODELS
 # ============================================
@@ -110,10 +141,20 @@ class Detection(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Initialize security system on startup"""
-    global security_system
+    global security_system, http_client
     
     logger.info("Starting Smart Security System...")
     
+    http_client = httpx.AsyncClient(
+        timeout=5,
+        limits=httpx.Limits(max_connections=4, max_keepalive_connections=4)
+    )
+    
+    # One encoder per stream, shared by all connected clients
+    broadcaster_tasks.append(asyncio.create_task(stream_broadcaster.run()))
+    broadcaster_tasks.append(asyncio.create_task(preview_broadcaster.run()))
+    broadcaster_tasks.append(asyncio.create_task(broadcast_stats()))
+    
     try:
         security_system = SecuritySystem(
             esp32_cam_url=config.ESP32_CAM_STREAM_URL,
@@ -124,8 +165,16 @@ async def startup_event():
             min_detections=config.MIN_DETECTIONS,
             save_images=config.SAVE_IMAGES,
             images_dir=config.IMAGES_DIR,
-            camera_manager=camera_manager
+            camera_manager=camera_manager,
+            frame_skip=config.FRAME_SKIP,
+            export_format=config.MODEL_EXPORT_FORMAT,
+            imgsz=config.IMAGE_SIZE,
+            person_imgsz=config.PERSON_IMAGE_SIZE,
+            face_batch=config.FACE_BATCH_SIZE,
+            int8=config.MODEL_EXPORT_INT8,
+            calibration_data=config.FACE_CALIBRATION_DATA
         )
+        security_system.on_frame = stream_broadcaster.notify
         logger.info("Security system initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize security system: {e}")
@@ -138,8 +187,8 @@ async def shutdown_event():
     
     logger.info("Shutting down Smart Security System...")
     
-    if security_system and system_active:
-        security_system.stop()
+    if security_system:
+        await asyncio.to_thread(security_system.close)
         system_active = False
         
     for ws in connected_websockets:
@@ -148,6 +197,13 @@ async def shutdown_event():
         except:
             pass
     
+    for task in broadcaster_tasks:
+        task.cancel()
+    encode_pool.shutdown(wait=False)
+    
+    if http_client:
+        await http_client.aclose()
+    
     logger.info("Shutdown complete")
 
 # ============================================
@@ -238,9 +294,11 @@ async def get_status():
         }
  
     stats = security_system.get_stats()
-    esp32_cam_status = check_esp32_status(config.ESP32_CAM_STATUS_URL)
-    esp32_buzzer_status = check_esp32_status(config.ESP32_BUZZER_STATUS_URL)
     detections_24h = security_system.get_24h_stats()
+    esp32_cam_status, esp32_buzzer_status = await asyncio.gather(
+        check_esp32_status(config.ESP32_CAM_STATUS_URL),
+        check_esp32_status(config.ESP32_BUZZER_STATUS_URL)
+    )
     
     return {
         "active": system_active,
@@ -311,7 +369,7 @@ async def update_settings(settings: DetectionSettings):
 async def test_buzzer():
     """Test the buzzer"""
     try:
-        response = requests.get(config.ESP32_BUZZER_TEST_URL, timeout=5)
+        response = await http_client.get(config.ESP32_BUZZER_TEST_URL)
         if response.status_code == 200:
             logger.info("Buzzer test successful")
             return {"status": "success", "message": "Buzzer test successful"}
@@ -326,7 +384,7 @@ async def trigger_alert(alert: AlertRequest):
     """Manually trigger buzzer alert"""
     try:
         url = f"{config.ESP32_BUZZER_ALERT_URL}?pattern={alert.pattern}"
-        response = requests.get(url, timeout=5)
+        response = await http_client.get(url)
         if response.status_code == 200:
             logger.info(f"Manual alert triggered: pattern {alert.pattern}")
             return {"status": "success", "message": f"Alert pattern {alert.pattern} triggered"}
@@ -339,9 +397,13 @@ async def trigger_alert(alert: AlertRequest):
 @app.get("/api/esp32/status")
 async def get_esp32_status():
     """Get ESP32 devices status"""
+    camera_status, buzzer_status = await asyncio.gather(
+        check_esp32_status(config.ESP32_CAM_STATUS_URL),
+        check_esp32_status(config.ESP32_BUZZER_STATUS_URL)
+    )
     return {
-        "camera": check_esp32_status(config.ESP32_CAM_STATUS_URL),
-        "buzzer": check_esp32_status(config.ESP32_BUZZER_STATUS_URL),
+        "camera": camera_status,
+        "buzzer": buzzer_status,
         "camera_url": config.ESP32_CAM_IP,
         "buzzer_url": config.ESP32_BUZZER_IP
     }
@@ -404,15 +466,7 @@ async def get_images(type: Optional[str] = None, limit: int = 50):
         search_paths = [base_path / "unknown", base_path / "known"]
 
     for path in search_paths:
-        if path.exists():
-            for img_file in sorted(path.glob("full_*.jpg"), reverse=True)[:limit]:
-                images.append({
-                    "filename": img_file.name,
-                    "path": str(img_file),
-                    "type": "unknown" if "unknown" in str(img_file) else "known",
-                    "timestamp": datetime.fromtimestamp(img_file.stat().st_mtime).isoformat(),
-                    "size": img_file.stat().st_size
-                })
+        images.extend(list_saved_images(path)[:limit])
     
     return images[:limit]
 
@@ -447,6 +501,124 @@ async def delete_image(filename: str):
 # STREAMING ENDPOINTS
 # ============================================
 
+MJPEG_PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+MJPEG_PART_TAIL = b'\r\n'
+
+class FrameBroadcaster:
+    """Encodes each frame from a source once and shares the JPEG with every stream client"""
+    
+    def __init__(self, read_frame, placeholder: bytes, pushed: bool = False):
+        """
+        Args:
+            read_frame: Callable returning the current BGR frame, or None if there is none
+            placeholder: JPEG bytes served while read_frame returns None
+            pushed: The producer calls notify() per new frame; otherwise read_frame
+                    itself blocks until the camera delivers the next frame
+        """
+        self.read_frame = read_frame
+        self.placeholder = placeholder
+        self.pushed = pushed
+        self.frame_bytes = placeholder
+        self.seq = 0
+        self.event = asyncio.Event()
+        self.frame_ready = asyncio.Event()
+        self.has_clients = asyncio.Event()
+        self.clients = 0
+        self.loop = None
+    
+    def notify(self):
+        """Signal that a new frame is available (safe to call from any thread)"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.frame_ready.set)
+    
+    def encode_next(self) -> Optional[bytes]:
+        """Read the current frame and encode it (runs in encode_pool)"""
+        frame = self.read_frame()
+        if frame is None:
+            return self.placeholder
+        
+        # Browsers show the stream small, so don't pay to encode full-resolution frames
+        h, w = frame.shape[:2]
+        scale = min(config.PREVIEW_W / w, config.PREVIEW_H / h)
+        if scale < 1:
+            frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        return encode_jpeg(frame)
+    
+    async def run(self):
+        """Encode each new frame while at least one client is connected"""
+        self.loop = asyncio.get_running_loop()
+        while True:
+            await self.has_clients.wait()
+            
+            if self.pushed:
+                # The timeout picks up a stopped or replaced producer
+                try:
+                    await asyncio.wait_for(self.frame_ready.wait(), timeout=1)
+                except asyncio.TimeoutError:
+                    pass
+                self.frame_ready.clear()
+            
+            frame_bytes = await self.loop.run_in_executor(encode_pool, self.encode_next)
+            if frame_bytes:
+                self.frame_bytes = frame_bytes
+                self.seq += 1
+                # Wake every waiting client, then re-arm for the next frame
+                self.event.set()
+                self.event.clear()
+            
+            if frame_bytes is self.placeholder and not self.pushed:
+                # No camera to pace on, so poll for one slowly
+                await asyncio.sleep(0.5)
+    
+    async def stream(self):
+        """
+        Yield MJPEG parts for one client
+        
+        Only the newest frame is sent: a client still writing the previous
+        frame skips whatever was encoded meanwhile instead of queueing it.
+        """
+        self.clients += 1
+        self.has_clients.set()
+        last_seq = -1
+        try:
+            while True:
+                if self.seq == last_seq:
+                    await self.event.wait()
+                    continue
+                last_seq = self.seq
+                # Separate chunks avoid copying the JPEG into a new bytes per client
+                yield MJPEG_PART_HEADER
+                yield self.frame_bytes
+                yield MJPEG_PART_TAIL
+        finally:
+            self.clients -= 1
+            if not self.clients:
+                self.has_clients.clear()
+
+def read_detection_frame():
+    """Latest processed frame from the security system"""
+    return security_system.current_frame if security_system else None
+
+def read_preview_frame():
+    """Latest camera frame with the capture progress drawn on it"""
+    ret, frame = camera_manager.read_frame()
+    if not ret or frame is None:
+        return None
+    
+    if training_manager.capturing:
+        sprite = training_manager.capture_overlay()
+        h = min(sprite.shape[0], frame.shape[0])
+        w = min(sprite.shape[1], frame.shape[1])
+        region = frame[:h, :w]
+        cv2.max(region, sprite[:h, :w], dst=region)
+    return frame
+
+stream_broadcaster = FrameBroadcaster(read_detection_frame, BLANK_FRAME_BYTES, pushed=True)
+preview_broadcaster = FrameBroadcaster(read_preview_frame, NO_CAMERA_FRAME_BYTES)
+broadcaster_tasks = []
+# Reading and encoding block for milliseconds, so they run here instead of on the event loop
+encode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="encode")
+
 @app.get("/api/stream")
 async def video_stream():
     """Stream processed video with detection boxes"""
@@ -454,28 +626,8 @@ async def video_stream():
     if not security_system:
         raise HTTPException(status_code=500, detail="Security system not initialized")
     
-    async def generate():
-        """Generate video frames"""
-        while True:
-            frame = security_system.current_frame
-            if frame is not None:
-                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                if ret:
-                    frame_bytes = buffer.tobytes()
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            else:
-                blank = np.zeros((480, 640, 3), dtype=np.uint8)
-                ret, buffer = cv2.imencode('.jpg', blank)
-                if ret:
-                    frame_bytes = buffer.tobytes()
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            
-            await asyncio.sleep(0.033)
-    
     return StreamingResponse(
-        generate(),
+        stream_broadcaster.stream(),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
@@ -483,25 +635,52 @@ async def video_stream():
 # WEBSOCKET ENDPOINTS
 # ============================================
 
+async def broadcast_stats():
+    """Serialize the stats once every 2 seconds for all WebSocket clients"""
+    global stats_message
+    
+    while True:
+        if security_system and connected_websockets:
+            message = orjson.dumps({
+                "type": "stats_update",
+                "data": security_system.get_stats()
+            }).decode()
+            if message != stats_message:
+                stats_message = message
+                stats_updated.set()
+                stats_updated.clear()
+        
+        await asyncio.sleep(2)
+
+async def wait_for_disconnect(websocket: WebSocket):
+    """Return once the client disconnects, ignoring anything it sends"""
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
 @app.websocket("/ws/events")
 async def websocket_events(websocket: WebSocket):
     """WebSocket for real-time events"""
     await websocket.accept()
     connected_websockets.append(websocket)
     
+    # Sending alone never notices a closed tab while the stats stay unchanged,
+    # so listen for the disconnect alongside every wait for new stats
+    disconnected = asyncio.create_task(wait_for_disconnect(websocket))
     try:
+        # Send the latest stats straight away, then only when they change
+        if stats_message:
+            await websocket.send_text(stats_message)
         while True:
-            if security_system:
-                stats = security_system.get_stats()
-                await websocket.send_json({
-                    "type": "stats_update",
-                    "data": stats
-                })
-            
-            await asyncio.sleep(2)
+            updated = asyncio.create_task(stats_updated.wait())
+            await asyncio.wait({updated, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                updated.cancel()
+                break
+            await websocket.send_text(stats_message)
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
+        disconnected.cancel()
         connected_websockets.remove(websocket)
 
 # ============================================
@@ -566,22 +745,28 @@ async def start_capture(request: dict):
     if not person_name:
         raise HTTPException(status_code=400, detail="Person name required")
     
+    training_cache.clear()
     return training_manager.start_capture(person_name, camera_source, auto, target)
 
 @app.post("/api/training/capture-frame")
-async def capture_frame():
-    """Capture current frame from camera"""
-    ret, frame = camera_manager.read_frame()
+async def capture_frame(manual: bool = False):
+    """Capture current frame from camera (manual=true for button presses, which skip dedup)"""
+    # read_frame waits for the grabber thread's next frame, so keep it off the event loop
+    ret, frame = await asyncio.to_thread(camera_manager.read_frame)
     
     if not ret or frame is None:
         raise HTTPException(status_code=500, detail="Failed to read frame from camera")
     
-    return training_manager.capture_frame(frame)
+    training_cache.clear()
+    # May block on a full write queue, or join the writers once the target is reached
+    return await asyncio.to_thread(training_manager.capture_frame, frame, manual)
 
 @app.post("/api/training/stop-capture")
 async def stop_capture():
     """Stop capturing images"""
-    return training_manager.stop_capture()
+    training_cache.clear()
+    # Waits for the writer threads to drain the queue
+    return await asyncio.to_thread(training_manager.stop_capture)
 
 @app.get("/api/training/capture-status")
 async def get_capture_status():
@@ -597,11 +782,12 @@ async def get_capture_status():
 @app.get("/api/training/datasets")
 async def get_datasets():
     """Get all collected datasets"""
-    return training_manager.get_datasets()
+    return cached_training_scan("datasets", training_manager.get_datasets)
 
 @app.delete("/api/training/dataset/{dataset_name}")
 async def delete_dataset(dataset_name: str):
     """Delete a dataset"""
+    training_cache.clear()
     return training_manager.delete_dataset(dataset_name)
 
 # ---------- Model Training ----------
@@ -612,7 +798,7 @@ async def start_training(request: dict):
     model_name = request.get("model_name")
     selected_datasets = request.get("datasets", [])
     epochs = request.get("epochs", 100)
-    batch = request.get("batch", 16)
+    batch = request.get("batch", -1)  # -1: Ultralytics picks the largest batch that fits in GPU memory
     imgsz = request.get("imgsz", 640)
     
     if not model_name:
@@ -621,6 +807,7 @@ async def start_training(request: dict):
     if not selected_datasets:
         raise HTTPException(status_code=400, detail="No datasets selected")
     
+    training_cache.clear()
     return training_manager.start_training(model_name, selected_datasets, epochs, batch, imgsz)
 
 @app.get("/api/training/status")
@@ -638,12 +825,12 @@ async def stop_training():
 @app.get("/api/training/models")
 async def get_models():
     """Get all trained models"""
-    return training_manager.get_models()
+    return cached_training_scan("models", training_manager.get_models)
 
 @app.get("/api/training/model/{model_name}")
 async def get_model_info(model_name: str):
     """Get model details"""
-    return training_manager.get_model_info(model_name)
+    return cached_training_scan(("model", model_name), training_manager.get_model_info, model_name)
 
 @app.post("/api/training/load-model")
 async def load_model(request: dict):
@@ -663,8 +850,12 @@ async def load_model(request: dict):
     if system_active and security_system:
         security_system.stop()
         system_active = False
+    if security_system:
+        # The old instance is dropped below; free its threads and connection first
+        await asyncio.to_thread(security_system.close)
    
     config.FACE_RECOGNITION_MODEL = str(model_path)
+    training_cache.clear()
    
     security_system = SecuritySystem(
         esp32_cam_url=config.ESP32_CAM_STREAM_URL,
@@ -675,8 +866,16 @@ async def load_model(request: dict):
         min_detections=config.MIN_DETECTIONS,
         save_images=config.SAVE_IMAGES,
         images_dir=config.IMAGES_DIR,
-        camera_manager=camera_manager
+        camera_manager=camera_manager,
+        frame_skip=config.FRAME_SKIP,
+        export_format=config.MODEL_EXPORT_FORMAT,
+        imgsz=config.IMAGE_SIZE,
+        person_imgsz=config.PERSON_IMAGE_SIZE,
+        face_batch=config.FACE_BATCH_SIZE,
+        int8=config.MODEL_EXPORT_INT8,
+        calibration_data=config.FACE_CALIBRATION_DATA
     )
+    security_system.on_frame = stream_broadcaster.notify
     
     logger.info(f"Loaded model: {model_name}")
     
@@ -689,6 +888,7 @@ async def load_model(request: dict):
 @app.delete("/api/training/model/{model_name}")
 async def delete_model(model_name: str):
     """Delete a trained model"""
+    training_cache.clear()
     return training_manager.delete_model(model_name)
 
 # ---------- Training Preview Stream ----------
@@ -696,34 +896,8 @@ async def delete_model(model_name: str):
 @app.get("/api/training/preview")
 async def training_preview():
     """Stream from selected camera for training preview"""
-    async def generate():
-        while True:
-            ret, frame = camera_manager.read_frame()
-            
-            if ret and frame is not None:
-                if training_manager.capturing:
-                    cv2.putText(frame, f"Capturing: {training_manager.captured_count}/{training_manager.target_count}", 
-                               (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            
-                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                if ret:
-                    frame_bytes = buffer.tobytes()
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            else:
-                blank = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(blank, "No Camera Selected", (150, 240),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                ret, buffer = cv2.imencode('.jpg', blank)
-                if ret:
-                    frame_bytes = buffer.tobytes()
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            
-            await asyncio.sleep(0.033)
-    
     return StreamingResponse(
-        generate(),
+        preview_broadcaster.stream(),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
@@ -740,16 +914,78 @@ async def training_page(request: Request):
 # HELPER FUNCTIONS
 # ============================================
 
-def check_esp32_status(url: str) -> str:
-    """Check if ESP32 is online"""
+def encode_jpeg(frame, quality: int = 80) -> Optional[bytes]:
+    """Encode a BGR frame as JPEG for streaming, or return None on failure"""
+    if turbo_jpeg is not None:
+        return turbo_jpeg.encode(frame, quality=quality, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)
+    
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ret else None
+
+async def check_esp32_status(url: str) -> str:
+    """Check if ESP32 is online (cached for ESP32_STATUS_CACHE_TTL seconds)"""
+    now = time.monotonic()
+    cached = esp32_status_cache.get(url)
+    if cached and cached[0] > now:
+        return cached[1]
+    
     try:
-        response = requests.get(url, timeout=3)
+        response = await http_client.get(url, timeout=3)
         if response.status_code == 200:
-            return "online"
+            status = "online"
         else:
-            return "error"
+            status = "error"
     except:
-        return "offline"
+        status = "offline"
+    
+    esp32_status_cache[url] = (now + config.ESP32_STATUS_CACHE_TTL, status)
+    return status
+
+def cached_training_scan(key, scan, *args):
+    """Reuse a training_manager disk scan for TRAINING_CACHE_TTL seconds"""
+    now = time.monotonic()
+    cached = training_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+    
+    result = scan(*args)
+    training_cache[key] = (now + config.TRAINING_CACHE_TTL, result)
+    return result
+
+def list_saved_images(path: Path) -> List[dict]:
+    """List full_*.jpg images in a directory, newest first, cached by directory mtime"""
+    # The directory mtime changes when a file is created, but SecuritySystem writes the
+    # bytes afterwards on its I/O pool; listings with a just-created file aren't cached
+    try:
+        dir_mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    
+    cached = image_list_cache.get(path)
+    if cached and cached[0] == dir_mtime:
+        return cached[1]
+    
+    image_type = "unknown" if path.name == "unknown" else "known"
+    images = []
+    newest_mtime = 0.0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if not (entry.name.startswith("full_") and entry.name.endswith(".jpg")):
+                continue
+            stat = entry.stat()
+            newest_mtime = max(newest_mtime, stat.st_mtime)
+            images.append({
+                "filename": entry.name,
+                "path": entry.path,
+                "type": image_type,
+                "timestamp": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                "size": stat.st_size
+            })
+    
+    images.sort(key=lambda image: image["timestamp"], reverse=True)
+    if time.time() - newest_mtime >= config.IMAGE_LIST_SETTLE_SECONDS:
+        image_list_cache[path] = (dir_mtime, images)
+    return images
 
 def get_last_alert_time() -> Optional[str]:
     """Get time of last unknown person alert"""
@@ -796,11 +1032,27 @@ def main():
     logger.info(f"Web Interface: http://{config.HOST}:{config.PORT}")
     logger.info("="*70)
     
+    # uvloop/httptools cut per-yield overhead on the streams; uvloop isn't available on Windows
+    try:
+        import uvloop
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    try:
+        import httptools
+        http = "httptools"
+    except ImportError:
+        http = "h11"
+    
+    # A single worker: the stream broadcasters and WebSocket stats are in-process state
     uvicorn.run(
         app,
         host=config.HOST,
         port=config.PORT,
-        log_level=config.LOG_LEVEL.lower()
+        log_level=config.LOG_LEVEL.lower(),
+        loop=loop,
+        http=http,
+        workers=1
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+"""
+Model Utilities
+Loads YOLO models, optionally through a one-time export specialized for a fixed input size
+"""
+
+from pathlib import Path
+from ultralytics import YOLO
+import shutil
+import tempfile
+import torch
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Where Ultralytics writes each export format, relative to the .pt file
+EXPORT_SUFFIXES = {
+    "openvino": "_openvino_model",
+    "engine": ".engine",
+    "onnx": ".onnx",
+}
+
+# Formats Ultralytics can quantize to INT8
+INT8_FORMATS = {"openvino", "engine"}
+
+def exported_model_path(model_path, export_format, imgsz=640, half=False, int8=False, batch=1):
+    """Path of the exported copy of model_path, named for the input size, precision and batch it was built for"""
+    path = Path(model_path)
+    precision = 'int8' if int8 else 'fp16' if half else 'fp32'
+    return path.with_name(f"{path.stem}_{imgsz}_{precision}_b{batch}{EXPORT_SUFFIXES[export_format]}")
+
+def predict_args():
+    """Predict kwargs for FP16 inference on CUDA; CPU inference stays FP32"""
+    return {'half': True, 'device': 0} if torch.cuda.is_available() else {}
+
+def load_yolo(model_path, export_format=None, imgsz=640, half=False, int8=False, data=None, batch=1):
+    """
+    Load a YOLO model, exporting it once to export_format if requested
+
+    The export is compiled for a fixed imgsz and precision, saved next to the weights
+    as e.g. best_640_fp16_b1.engine and reused on later runs. Delete it to force a fresh export.
+    Exports take batches of at most `batch` images; callers must split larger ones.
+
+    Args:
+        model_path: Path to .pt weights
+        export_format: None for plain PyTorch, or one of EXPORT_SUFFIXES
+        imgsz: Input size the export is specialized for
+        half: Export with FP16 weights
+        int8: Export INT8-quantized ("engine" needs TensorRT >= 8.5); overrides half
+        data: Dataset YAML whose images calibrate INT8 (Ultralytics' default when None)
+        batch: Largest batch the export must accept (above 1 it's built with a dynamic batch axis)
+    """
+    if not export_format:
+        return YOLO(model_path)
+    if int8 and export_format not in INT8_FORMATS:
+        raise ValueError(f"INT8 export is not supported for {export_format} "
+                         f"(use one of {', '.join(sorted(INT8_FORMATS))})")
+
+    exported = exported_model_path(model_path, export_format, imgsz, half, int8, batch)
+    if not exported.exists():
+        logger.info(f"Exporting {model_path} to {export_format} "
+                    f"(imgsz={imgsz}, half={half}, int8={int8}, batch={batch})")
+        model = YOLO(model_path)
+        # Ultralytics writes next to the weights under a fixed name, which would replace
+        # an export built for another size or precision; export from a scratch copy and
+        # move only the result over
+        with tempfile.TemporaryDirectory(dir=exported.parent) as scratch:
+            weights = Path(scratch) / Path(model.ckpt_path).name
+            shutil.copy2(model.ckpt_path, weights)
+            export_args = {'int8': True, 'data': data} if int8 else {'half': half}
+            if batch > 1:
+                # Exports are batch-1 by default and reject list batches
+                export_args.update(dynamic=True, batch=batch)
+            output = YOLO(str(weights)).export(format=export_format, imgsz=imgsz, **export_args)
+            Path(output).replace(exported)
+
+    logger.info(f"Using {export_format} model: {exported}")
+    return YOLO(str(exported), task='detect')
\ No newline at end of file
@@ -4,11 +4,18 @@ Organizes images and labels into train/val splits for YOLOv8 training
 """
 
 import os
-import shutil
 from pathlib import Path
 import random
+from concurrent.futures import ThreadPoolExecutor
+from file_utils import link_or_copy
 
-def organize_dataset(images_dir, labels_dir, output_dir='dataset', train_split=0.8):
+def _copy_pair(pair):
+    """Place one image and its label into the split directories"""
+    img_path, label_path, images_dir, labels_dir = pair
+    link_or_copy(img_path, os.path.join(images_dir, img_path.name))
+    link_or_copy(label_path, os.path.join(labels_dir, label_path.name))
+
+def organize_dataset(images_dir, labels_dir, output_dir='dataset', train_split=0.8, workers=16):
     """
     Organize images and labels into train/val structure
     
@@ -17,6 +24,7 @@ def organize_dataset(images_dir, labels_dir, output_dir='dataset', train_split=0
         labels_dir: Directory containing label files
         output_dir: Output directory for organized dataset
         train_split: Proportion of data for training (0-1)
+        workers: Concurrent file copies (use ~2 on spinning disks)
     """
     
     train_images_dir = os.path.join(output_dir, 'images', 'train')
@@ -27,16 +35,25 @@ def organize_dataset(images_dir, labels_dir, output_dir='dataset', train_split=0
     for dir_path in [train_images_dir, val_images_dir, train_labels_dir, val_labels_dir]:
         os.makedirs(dir_path, exist_ok=True)
     
-    image_extensions = ['.jpg', '.jpeg', '.png', '.bmp']
-    image_files = []
-    for ext in image_extensions:
-        image_files.extend(Path(images_dir).glob(f'*{ext}'))
+    image_extensions = {'.jpg', '.jpeg', '.png', '.bmp'}
+    with os.scandir(images_dir) as entries:
+        image_files = [Path(entry.path) for entry in entries
+                       if entry.is_file() and os.path.splitext(entry.name)[1].lower() in image_extensions]
+    
+    # One listing of the labels directory instead of an exists() check per image.
+    # Keyed by normcase so IMG.JPG still pairs with img.txt on case-insensitive Windows
+    label_names = {}
+    if os.path.isdir(labels_dir):
+        with os.scandir(labels_dir) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith('.txt'):
+                    label_names[os.path.normcase(entry.name)] = entry.name
     
     valid_pairs = []
     for img_path in image_files:
-        label_path = Path(labels_dir) / (img_path.stem + '.txt')
-        if label_path.exists():
-            valid_pairs.append((img_path, label_path))
+        label_name = label_names.get(os.path.normcase(img_path.stem + '.txt'))
+        if label_name is not None:
+            valid_pairs.append((img_path, Path(labels_dir) / label_name))
     
     print(f"\n{'='*60}")
     print("DATASET ORGANIZATION")
@@ -58,15 +75,15 @@ def organize_dataset(images_dir, labels_dir, output_dir='dataset', train_split=0
     
     print(f"\nTrain samples: {len(train_pairs)}")
     print(f"Val samples: {len(val_pairs)}")
-    print(f"\nCopying files...")
+    print(f"\nLinking files...")
     
-    for img_path, label_path in train_pairs:
-        shutil.copy2(img_path, os.path.join(train_images_dir, img_path.name))
-        shutil.copy2(label_path, os.path.join(train_labels_dir, label_path.name))
+    copies = [(img_path, label_path, train_images_dir, train_labels_dir)
+              for img_path, label_path in train_pairs]
+    copies += [(img_path, label_path, val_images_dir, val_labels_dir)
+               for img_path, label_path in val_pairs]
     
-    for img_path, label_path in val_pairs:
-        shutil.copy2(img_path, os.path.join(val_images_dir, img_path.name))
-        shutil.copy2(label_path, os.path.join(val_labels_dir, label_path.name))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_copy_pair, copies))
     
     print(f"\n{'='*60}")
     print("Dataset organization complete!")
@@ -94,7 +111,9 @@ if __name__ == "__main__":
                         help='Output directory')
     parser.add_argument('--split', type=float, default=0.8,
                         help='Train split ratio (0-1)')
+    parser.add_argument('--workers', type=int, default=16,
+                        help='Concurrent file copies')
     
     args = parser.parse_args()
     
-    organize_dataset(args.images, args.labels, args.output, args.split)
\ No newline at end of file
+    organize_dataset(args.images, args.labels, args.output, args.split, args.workers)
\ No newline at end of file
@@ -7,6 +7,12 @@ import cv2
 from ultralytics import YOLO
 import os
 import sys
+import torch
+import torch.nn.functional as F
+
+# Shared helpers live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_utils import predict_args
 
 print("="*70)
 print("SIMPLE FACE DETECTION TEST")
@@ -16,6 +22,34 @@ print("="*70)
 PERSON_CONF = 0.75
 KNOWN_CONF = 0.92
 MIN_DETECTIONS = 5
+MODEL_SIZE = 640
+
+# On CUDA the frame is uploaded once and both models read from that copy
+USE_CUDA = torch.cuda.is_available()
+
+# FP16 on CUDA, FP32 on CPU
+PREDICT_ARGS = predict_args()
+
+def to_gpu(frame):
+    """Upload a BGR frame as a normalized RGB (1, 3, H, W) FP16 CUDA tensor"""
+    frame_t = torch.from_numpy(frame).to('cuda', non_blocking=True)
+    return frame_t.flip(-1).permute(2, 0, 1).unsqueeze(0).half().div_(255)
+
+def fit_model(image_t):
+    """
+    Letterbox a (1, 3, H, W) tensor into the square model input (YOLO doesn't letterbox tensors)
+    
+    The aspect ratio is kept and the border padded grey like Ultralytics' letterbox.
+    Returns the input tensor and (ratio, left, top) for mapping boxes back.
+    """
+    h, w = image_t.shape[-2:]
+    ratio = MODEL_SIZE / max(h, w)
+    new_h, new_w = max(1, round(h * ratio)), max(1, round(w * ratio))
+    top, left = (MODEL_SIZE - new_h) // 2, (MODEL_SIZE - new_w) // 2
+    resized = F.interpolate(image_t, size=(new_h, new_w), mode='bilinear', align_corners=False)
+    boxed = resized.new_full((1, 3, MODEL_SIZE, MODEL_SIZE), 114 / 255)
+    boxed[:, :, top:top + new_h, left:left + new_w] = resized
+    return boxed, (ratio, left, top)
 
 # Check model file
 model_path = r".\runs\face_detection\my_face_model5\weights\best.pt"
@@ -105,13 +139,24 @@ try:
         frame_number += 1
         
         # Detect persons
-        person_results = person_detector(frame, classes=[0], conf=PERSON_CONF, verbose=False)
+        if USE_CUDA:
+            frame_t = to_gpu(frame)
+            model_input, (ratio, left, top) = fit_model(frame_t)
+            person_results = person_detector(model_input, classes=[0], conf=PERSON_CONF, verbose=False,
+                                             **PREDICT_ARGS)
+            # Boxes come back in letterboxed input coordinates
+            offset = torch.tensor([left, top, left, top], device='cuda')
+            person_boxes = ((person_results[0].boxes.xyxy - offset) / ratio).int().tolist()
+        else:
+            person_results = person_detector(frame, classes=[0], conf=PERSON_CONF, verbose=False)
+            person_boxes = person_results[0].boxes.xyxy.int().tolist()
+        person_confs = person_results[0].boxes.conf.tolist()
         
         detected_this_frame = []
+        persons = []
         
-        for idx, person_box in enumerate(person_results[0].boxes):
-            x1, y1, x2, y2 = map(int, person_box.xyxy[0])
-            person_conf = float(person_box.conf[0])
+        for idx, ((x1, y1, x2, y2), person_conf) in enumerate(zip(person_boxes, person_confs)):
+            x1, y1 = max(x1, 0), max(y1, 0)
             
             # Track detections
             track_id = f"person_{idx}"
@@ -119,12 +164,27 @@ try:
                 detection_count[track_id] = 0
             detection_count[track_id] += 1
             
-            current_count = detection_count[track_id]
             detected_this_frame.append(track_id)
-            
-            # Crop person
-            person_crop = frame[y1:y2, x1:x2]
-            
+            persons.append((x1, y1, x2, y2, person_conf, detection_count[track_id]))
+        
+        # Check faces of every verified person with one batched call
+        to_check = [i for i, (x1, y1, x2, y2, _, count) in enumerate(persons)
+                    if count >= MIN_DETECTIONS and x2 > x1 and y2 > y1]
+        face_confs = {}
+        if to_check:
+            if USE_CUDA:
+                # Letterboxed to one square size so the crops stack into a single batch
+                crops = torch.cat([fit_model(frame_t[:, :, y1:y2, x1:x2])[0]
+                                   for x1, y1, x2, y2, _, _ in (persons[i] for i in to_check)])
+            else:
+                # YOLO letterboxes numpy crops itself
+                crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2, _, _ in (persons[i] for i in to_check)]
+            face_results = face_recognizer(crops, conf=KNOWN_CONF, verbose=False, **PREDICT_ARGS)
+            for i, result in zip(to_check, face_results):
+                if len(result.boxes) > 0:
+                    face_confs[i] = float(result.boxes.conf[0])
+        
+        for i, (x1, y1, x2, y2, person_conf, current_count) in enumerate(persons):
             if current_count < MIN_DETECTIONS:
                 # Still verifying - Yellow box
                 cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
@@ -132,16 +192,8 @@ try:
                 cv2.putText(frame, label, (x1, y1-10),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
             else:
-                # Check face
-                is_known = False
-                face_conf = 0.0
-                
-                if person_crop.size > 0:
-                    face_results = face_recognizer(person_crop, conf=KNOWN_CONF, verbose=False)
-                    
-                    if len(face_results[0].boxes) > 0:
-                        is_known = True
-                        face_conf = float(face_results[0].boxes[0].conf[0])
+                is_known = i in face_confs
+                face_conf = face_confs.get(i, 0.0)
                 
                 if is_known:
                     # KNOWN - Green box
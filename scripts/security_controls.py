@@ -3,16 +3,28 @@ Security System Control Panel
 Manage logs, data, and system settings
 """
 
-import json
 import os
 import shutil
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from pathlib import Path
+
+# Shared helpers live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from log_io import is_jsonl, read_log, resolve_log_file, write_log
 
 class SecurityControl:
-    def __init__(self, log_file='security_log.json', images_dir='security_images'):
-        self.log_file = log_file
+    def __init__(self, log_file='security_log.json', images_dir='security_images', delete_workers=1):
+        # Prefer the JSON Lines log the security system writes (it migrates the legacy
+        # JSON array on startup); the array is only read for logs it hasn't touched yet
+        self.log_file = resolve_log_file(log_file)
+        self.jsonl = is_jsonl(self.log_file)
         self.images_dir = images_dir
+        # Concurrent unlinks only pay off on latency-bound (network/FUSE) storage
+        self.delete_workers = delete_workers
+        self._log_cache = []
+        self._cache_stamp = None
     
     def show_menu(self):
         """Display control menu"""
@@ -31,44 +43,79 @@ class SecurityControl:
         print("0. Exit")
         print("="*70)
     
+    def _log_stamp(self):
+        """(mtime, size) of the log file, or None when there is no log"""
+        try:
+            st = os.stat(self.log_file)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+    
     def get_log_data(self):
-        """Load log data"""
-        if os.path.exists(self.log_file):
-            with open(self.log_file, 'r') as f:
-                return json.load(f)
-        return []
+        """Load log data (cached until the file changes on disk)"""
+        stamp = self._log_stamp()
+        if stamp is None:
+            return []
+        if stamp == self._cache_stamp:
+            return self._log_cache
+        
+        data = read_log(self.log_file)
+        self._log_cache, self._cache_stamp = data, stamp
+        return data
+    
+    def _iter_logs(self):
+        """Iterate log entries, parsing the log only when it changed since the last menu action"""
+        return iter(self.get_log_data())
     
     def save_log_data(self, data):
         """Save log data"""
-        with open(self.log_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        write_log(self.log_file, data)
+        self._log_cache, self._cache_stamp = data, self._log_stamp()
+    
+    def _walk_images(self):
+        """Yield (path, size, mtime) for every .jpg under the images directory"""
+        # Explicit stack like os.walk, without nested generators re-yielding every file;
+        # os.walk itself is avoided because it throws away the DirEntry stat results
+        pending = [self.images_dir]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.endswith('.jpg'):
+                        # DirEntry caches the stat result, so no extra syscall per file on Windows
+                        st = entry.stat()
+                        yield entry.path, st.st_size, st.st_mtime
     
     def view_statistics(self):
         """Show system statistics"""
-        logs = self.get_log_data()
-        
-        if not logs:
+        # One pass for all counters; ISO timestamps compare correctly as strings
+        cutoff_24h = (datetime.now() - timedelta(hours=24)).isoformat()
+        total = known = unknown = unknown_24h = 0
+        first = last = None
+        for l in self._iter_logs():
+            total += 1
+            if first is None:
+                first = l
+            last = l
+            if l['type'] == 'known':
+                known += 1
+            elif l['type'] == 'unknown':
+                unknown += 1
+                if l['timestamp'] > cutoff_24h:
+                    unknown_24h += 1
+        
+        if not total:
             print("\n❌ No data found")
             return
         
-        total = len(logs)
-        known = sum(1 for l in logs if l['type'] == 'known')
-        unknown = sum(1 for l in logs if l['type'] == 'unknown')
-        
-        # 24h stats
-        now = datetime.now()
-        cutoff_24h = now - timedelta(hours=24)
-        unknown_24h = sum(1 for l in logs 
-                         if l['type'] == 'unknown' 
-                         and datetime.fromisoformat(l['timestamp']) > cutoff_24h)
-        
         # Count images
         image_count = 0
         image_size = 0
         if os.path.exists(self.images_dir):
-            for f in Path(self.images_dir).glob('**/*.jpg'):
+            for _, size, _ in self._walk_images():
                 image_count += 1
-                image_size += f.stat().st_size
+                image_size += size
         
         print("\n" + "="*70)
         print("SYSTEM STATISTICS")
@@ -82,9 +129,8 @@ class SecurityControl:
         print(f"  Saved images: {image_count}")
         print(f"  Storage used: {image_size / (1024*1024):.2f} MB")
         
-        if logs:
-            print(f"\nFirst detection: {logs[0]['date']} {logs[0]['time']}")
-            print(f"Last detection: {logs[-1]['date']} {logs[-1]['time']}")
+        print(f"\nFirst detection: {first['date']} {first['time']}")
+        print(f"Last detection: {last['date']} {last['time']}")
         
         print("="*70)
     
@@ -109,16 +155,15 @@ class SecurityControl:
             print("❌ No logs to delete")
             return
         
-        now = datetime.now()
-        cutoff = now - timedelta(days=days)
+        # ISO timestamps compare correctly as strings, so no per-entry datetime parsing
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
         
         filtered = []
         removed = 0
         
         for log in logs:
             try:
-                log_time = datetime.fromisoformat(log['timestamp'])
-                if log_time > cutoff:
+                if log['timestamp'] > cutoff:
                     filtered.append(log)
                 else:
                     removed += 1
@@ -141,7 +186,10 @@ class SecurityControl:
             print("❌ No images directory found")
             return
         
-        image_count = len(list(Path(self.images_dir).glob('**/*.jpg')))
+        # Count straight off the scandir walk instead of materializing a list of Paths
+        image_count = 0
+        for _ in self._walk_images():
+            image_count += 1
         
         if image_count == 0:
             print("❌ No images to delete")
@@ -161,27 +209,30 @@ class SecurityControl:
             print("❌ No images directory found")
             return
         
-        now = datetime.now()
-        cutoff = now - timedelta(days=days)
+        # Compare raw epoch floats rather than building a datetime per file
+        cutoff_ts = (datetime.now() - timedelta(days=days)).timestamp()
         
-        removed = 0
+        # Walk once and remember what to delete, instead of walking again after the prompt
+        candidates = []
         total_size = 0
         
-        for img_path in Path(self.images_dir).glob('**/*.jpg'):
+        for img_path, size, st_mtime in self._walk_images():
             # Check file modification time
-            mtime = datetime.fromtimestamp(img_path.stat().st_mtime)
-            if mtime < cutoff:
-                removed += 1
-                total_size += img_path.stat().st_size
+            if st_mtime < cutoff_ts:
+                candidates.append(img_path)
+                total_size += size
         
-        if removed > 0:
-            confirm = input(f"\n⚠️  Delete {removed} old images (>{days} days, {total_size/(1024*1024):.2f} MB)? (yes/no): ")
+        if candidates:
+            confirm = input(f"\n⚠️  Delete {len(candidates)} old images (>{days} days, {total_size/(1024*1024):.2f} MB)? (yes/no): ")
             if confirm.lower() == 'yes':
-                deleted = 0
-                for img_path in Path(self.images_dir).glob('**/*.jpg'):
-                    mtime = datetime.fromtimestamp(img_path.stat().st_mtime)
-                    if mtime < cutoff:
-                        img_path.unlink()
+                if self.delete_workers > 1:
+                    with ThreadPoolExecutor(max_workers=self.delete_workers) as executor:
+                        list(executor.map(os.remove, candidates))
+                    deleted = len(candidates)
+                else:
+                    deleted = 0
+                    for img_path in candidates:
+                        os.remove(img_path)
                         deleted += 1
                 print(f"✅ Deleted {deleted} old images")
             else:
@@ -191,16 +242,16 @@ class SecurityControl:
     
     def view_recent_alerts(self, count=10):
         """Show recent unknown person alerts"""
-        logs = self.get_log_data()
-        
-        unknown_logs = [l for l in logs if l['type'] == 'unknown']
+        # Stream the log and keep only the newest `count` unknowns
+        recent = deque(maxlen=count)
+        for l in self._iter_logs():
+            if l['type'] == 'unknown':
+                recent.append(l)
         
-        if not unknown_logs:
+        if not recent:
             print("\n✅ No unknown person alerts")
             return
         
-        recent = unknown_logs[-count:]
-        
         print("\n" + "="*70)
         print(f"RECENT UNKNOWN PERSON ALERTS (Last {len(recent)})")
         print("="*70)
@@ -212,38 +263,52 @@ class SecurityControl:
     
     def export_report(self, output_file='security_report.txt'):
         """Export detailed report"""
-        logs = self.get_log_data()
-        
-        if not logs:
+        # Only unknown alerts are listed in full; known detections just need first/last
+        total = 0
+        unknown = []
+        known_count = 0
+        known_first = known_last = None
+        for l in self._iter_logs():
+            total += 1
+            if l['type'] == 'unknown':
+                unknown.append(l)
+            elif l['type'] == 'known':
+                known_count += 1
+                if known_first is None:
+                    known_first = l
+                known_last = l
+        
+        if not total:
             print("❌ No data to export")
             return
         
         now = datetime.now()
         
-        with open(output_file, 'w') as f:
-            f.write("="*70 + "\n")
-            f.write("SECURITY SYSTEM REPORT\n")
-            f.write("="*70 + "\n")
-            f.write(f"Generated: {now.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Total Detections: {len(logs)}\n")
-            f.write("="*70 + "\n\n")
+        # Assemble the whole report in memory and hand it to the OS in one write
+        parts = [
+            "="*70 + "\n",
+            "SECURITY SYSTEM REPORT\n",
+            "="*70 + "\n",
+            f"Generated: {now.strftime('%Y-%m-%d %H:%M:%S')}\n",
+            f"Total Detections: {total}\n",
+            "="*70 + "\n\n",
             
             # Unknown alerts
-            unknown = [l for l in logs if l['type'] == 'unknown']
-            f.write(f"UNKNOWN PERSON ALERTS: {len(unknown)}\n")
-            f.write("-"*70 + "\n")
-            for log in unknown:
-                f.write(f"{log['date']} {log['time']} - Confidence: {log['confidence']:.2f}\n")
-            
-            f.write("\n" + "="*70 + "\n\n")
-            
-            # Known detections
-            known = [l for l in logs if l['type'] == 'known']
-            f.write(f"KNOWN PERSON DETECTIONS: {len(known)}\n")
-            f.write("-"*70 + "\n")
-            if known:
-                f.write(f"First: {known[0]['date']} {known[0]['time']}\n")
-                f.write(f"Last: {known[-1]['date']} {known[-1]['time']}\n")
+            f"UNKNOWN PERSON ALERTS: {len(unknown)}\n",
+            "-"*70 + "\n",
+        ]
+        parts.extend(f"{log['date']} {log['time']} - Confidence: {log['confidence']:.2f}\n" for log in unknown)
+        parts.append("\n" + "="*70 + "\n\n")
+        
+        # Known detections
+        parts.append(f"KNOWN PERSON DETECTIONS: {known_count}\n")
+        parts.append("-"*70 + "\n")
+        if known_count:
+            parts.append(f"First: {known_first['date']} {known_first['time']}\n")
+            parts.append(f"Last: {known_last['date']} {known_last['time']}\n")
+        
+        with open(output_file, 'w', buffering=1 << 16) as f:
+            f.write(''.join(parts))
         
         print(f"✅ Report exported to {output_file}")
     
@@ -269,20 +334,30 @@ class SecurityControl:
     def show_storage_usage(self):
         """Show detailed storage usage"""
         # Log file size
-        log_size = 0
+        # One stat for existence, size and cache freshness
+        stamp = self._log_stamp()
+        log_size = stamp[1] if stamp else 0
         log_count = 0
-        if os.path.exists(self.log_file):
-            log_size = os.path.getsize(self.log_file)
-            with open(self.log_file, 'r') as f:
-                log_count = len(json.load(f))
+        if stamp == self._cache_stamp:
+            log_count = len(self._log_cache)
+        elif self.jsonl and log_size > 0:
+            # One entry per line: count newlines over raw 1 MB chunks, no JSON decoding
+            last = b'\n'
+            with open(self.log_file, 'rb', buffering=0) as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    log_count += chunk.count(b'\n')
+                    last = chunk[-1:]
+            log_count += last != b'\n'
+        elif log_size > 0:
+            log_count = len(self.get_log_data())
         
         # Images
         image_count = 0
         image_size = 0
         if os.path.exists(self.images_dir):
-            for f in Path(self.images_dir).glob('**/*.jpg'):
+            for _, size, _ in self._walk_images():
                 image_count += 1
-                image_size += f.stat().st_size
+                image_size += size
         
         print("\n" + "="*70)
         print("STORAGE USAGE")
@@ -343,10 +418,12 @@ def main():
                        help='Path to log file')
     parser.add_argument('--images', type=str, default='security_images',
                        help='Path to images directory')
+    parser.add_argument('--delete-workers', type=int, default=1,
+                       help='Concurrent deletes for old images (e.g. 32 on network storage)')
     
     args = parser.parse_args()
     
-    control = SecurityControl(args.log, args.images)
+    control = SecurityControl(args.log, args.images, args.delete_workers)
     control.run()
 
 
@@ -5,6 +5,11 @@ Checks your face model details and what it was trained on
 
 from ultralytics import YOLO
 import os
+import sys
+
+# Shared helpers live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_utils import predict_args
 
 print("="*70)
 print("FACE MODEL INFORMATION")
@@ -12,6 +17,9 @@ print("="*70)
 
 model_path = r".\runs\face_detection\my_face_model5\weights\best.pt"
 
+# FP16 on CUDA, FP32 on CPU
+PREDICT_ARGS = predict_args()
+
 # Check if exists
 print(f"\n[1] Checking model file...")
 print(f"    Path: {model_path}")
@@ -71,8 +79,8 @@ import numpy as np
 test_image = np.zeros((640, 640, 3), dtype=np.uint8)
 
 try:
-    results = model(test_image, verbose=False)
-    print(f"    ✅ Model can make predictions!")
+    results = model(test_image, verbose=False, **PREDICT_ARGS)
+    print(f"    ✅ Model can make predictions! ({'FP16 on CUDA' if PREDICT_ARGS else 'FP32 on CPU'})")
     print(f"    Detections on test image: {len(results[0].boxes)}")
 except Exception as e:
     print(f"    ❌ ERROR during prediction: {e}")
@@ -3,22 +3,79 @@ Security Log Viewer
 View and analyze security system logs
 """
 
-import json
+import bisect
 import os
+import sys
 from datetime import datetime, timedelta
-from collections import defaultdict
+
+# Shared helpers live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from log_io import read_log, resolve_log_file, write_log
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Logs at least this long are aggregated with numpy instead of Python loops
+VECTORIZE_MIN_ENTRIES = 10000
 
 class SecurityLogViewer:
     def __init__(self, log_file='security_log.json'):
-        self.log_file = log_file
+        # Prefer the append-only JSON Lines log when it sits next to the legacy JSON array
+        self.log_file = resolve_log_file(log_file)
         self.detections = self.load_log()
+        self._index_timestamps()
     
     def load_log(self):
         """Load detection log"""
-        if os.path.exists(self.log_file):
-            with open(self.log_file, 'r') as f:
-                return json.load(f)
-        return []
+        return read_log(self.log_file)
+    
+    def _index_timestamps(self):
+        """Keep a parallel list of timestamps for binary searching the window start"""
+        self.timestamps = [d.get('timestamp', '') for d in self.detections]
+        # The log is appended chronologically; verify once so a hand-edited log still works
+        self.chronological = all(a <= b for a, b in zip(self.timestamps, self.timestamps[1:]))
+        self._column_cache = None
+    
+    def _columns(self):
+        """
+        Column arrays of the log for numpy aggregation, built once per load
+        
+        Returns None when numpy is missing or the log is small enough that
+        the plain loops are already instant.
+        """
+        if np is None or len(self.detections) < VECTORIZE_MIN_ENTRIES:
+            return None
+        if self._column_cache is None:
+            timestamps = np.array(self.timestamps, dtype=str)
+            unknown = np.fromiter((d.get('type') == 'unknown' for d in self.detections),
+                                  dtype=bool, count=len(self.detections))
+            
+            # Read the hour digits (YYYY-MM-DDTHH) straight from the UCS-4 code points
+            width = timestamps.dtype.itemsize // 4
+            if width >= 13:
+                digits = timestamps.view(np.uint32).reshape(-1, width)[:, 11:13].astype(np.int32) - ord('0')
+                hour = digits[:, 0] * 10 + digits[:, 1]
+                valid_hour = ((digits >= 0) & (digits <= 9)).all(axis=1) & (hour < 24)
+            else:
+                hour = np.zeros(len(timestamps), dtype=np.int32)
+                valid_hour = np.zeros(len(timestamps), dtype=bool)
+            
+            self._column_cache = {
+                'timestamp': timestamps,
+                'unknown': unknown,
+                'hour': hour,
+                'valid_hour': valid_hour,
+            }
+        return self._column_cache
+    
+    def _since(self, cutoff):
+        """Detections newer than cutoff (ISO timestamps compare correctly as strings)"""
+        cutoff_iso = cutoff.isoformat()
+        if self.chronological:
+            return self.detections[bisect.bisect_right(self.timestamps, cutoff_iso):]
+        return [d for d, ts in zip(self.detections, self.timestamps) if ts > cutoff_iso]
     
     def show_24h_report(self):
         """Show 24-hour detection report"""
@@ -28,16 +85,11 @@ class SecurityLogViewer:
         unknown_detections = []
         known_detections = []
         
-        for detection in self.detections:
-            try:
-                detection_time = datetime.fromisoformat(detection['timestamp'])
-                if detection_time > cutoff:
-                    if detection['type'] == 'unknown':
-                        unknown_detections.append(detection)
-                    else:
-                        known_detections.append(detection)
-            except:
-                continue
+        for detection in self._since(cutoff):
+            if detection['type'] == 'unknown':
+                unknown_detections.append(detection)
+            else:
+                known_detections.append(detection)
         
         print("\n" + "="*70)
         print("24-HOUR SECURITY REPORT")
@@ -76,26 +128,31 @@ class SecurityLogViewer:
         now = datetime.now()
         cutoff = now - timedelta(hours=24)
         
-        hourly_unknown = defaultdict(int)
-        hourly_known = defaultdict(int)
-        
-        for detection in self.detections:
-            try:
-                detection_time = datetime.fromisoformat(detection['timestamp'])
-                if detection_time > cutoff:
-                    hour = detection_time.strftime('%H:00')
+        cols = self._columns()
+        if cols is not None:
+            window = (cols['timestamp'] > cutoff.isoformat()) & cols['valid_hour']
+            hourly_unknown = np.bincount(cols['hour'][window & cols['unknown']], minlength=24).tolist()
+            hourly_known = np.bincount(cols['hour'][window & ~cols['unknown']], minlength=24).tolist()
+        else:
+            # Exactly 24 buckets; the hour is read straight out of the ISO string (YYYY-MM-DDTHH:...)
+            hourly_unknown = [0] * 24
+            hourly_known = [0] * 24
+            
+            for detection in self._since(cutoff):
+                try:
+                    hour = int(detection['timestamp'][11:13])
                     if detection['type'] == 'unknown':
                         hourly_unknown[hour] += 1
                     else:
                         hourly_known[hour] += 1
-            except:
-                continue
+                except:
+                    continue
         
         print("\n" + "="*70)
         print("HOURLY BREAKDOWN (Last 24 Hours)")
         print("="*70)
         
-        all_hours = sorted(set(list(hourly_unknown.keys()) + list(hourly_known.keys())))
+        all_hours = [h for h in range(24) if hourly_known[h] or hourly_unknown[h]]
         
         if not all_hours:
             print("No detections in the last 24 hours")
@@ -110,7 +167,7 @@ class SecurityLogViewer:
             total = known + unknown
             
             unknown_marker = " 🚨" if unknown > 0 else ""
-            print(f"{hour:<10} {known:<10} {unknown:<10} {total:<10}{unknown_marker}")
+            print(f"{f'{hour:02d}:00':<10} {known:<10} {unknown:<10} {total:<10}{unknown_marker}")
         
         print("="*70 + "\n")
     
@@ -121,7 +178,11 @@ class SecurityLogViewer:
             return
         
         total = len(self.detections)
-        unknown = sum(1 for d in self.detections if d['type'] == 'unknown')
+        cols = self._columns()
+        if cols is not None:
+            unknown = int(cols['unknown'].sum())
+        else:
+            unknown = sum(1 for d in self.detections if d['type'] == 'unknown')
         known = total - unknown
         
         print("\n" + "="*70)
@@ -144,44 +205,40 @@ class SecurityLogViewer:
         now = datetime.now()
         cutoff = now - timedelta(hours=24)
         
-        unknown_detections = []
-        for detection in self.detections:
-            try:
-                detection_time = datetime.fromisoformat(detection['timestamp'])
-                if detection_time > cutoff and detection['type'] == 'unknown':
-                    unknown_detections.append(detection)
-            except:
-                continue
-        
-        with open(output_file, 'w') as f:
-            f.write("="*70 + "\n")
-            f.write("UNKNOWN PERSON ALERTS - LAST 24 HOURS\n")
-            f.write("="*70 + "\n")
-            f.write(f"Generated: {now.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Total Alerts: {len(unknown_detections)}\n")
-            f.write("="*70 + "\n\n")
-            
-            for i, detection in enumerate(unknown_detections, 1):
-                f.write(f"Alert #{i}\n")
-                f.write(f"  Date: {detection['date']}\n")
-                f.write(f"  Time: {detection['time']}\n")
-                f.write(f"  Confidence: {detection['confidence']:.2f}\n")
-                f.write("-"*70 + "\n")
+        unknown_detections = [d for d in self._since(cutoff) if d['type'] == 'unknown']
+        
+        # Assemble the whole export in memory and hand it to the OS in one write
+        parts = [
+            "="*70 + "\n",
+            "UNKNOWN PERSON ALERTS - LAST 24 HOURS\n",
+            "="*70 + "\n",
+            f"Generated: {now.strftime('%Y-%m-%d %H:%M:%S')}\n",
+            f"Total Alerts: {len(unknown_detections)}\n",
+            "="*70 + "\n\n",
+        ]
+        for i, detection in enumerate(unknown_detections, 1):
+            parts.append(f"Alert #{i}\n"
+                         f"  Date: {detection['date']}\n"
+                         f"  Time: {detection['time']}\n"
+                         f"  Confidence: {detection['confidence']:.2f}\n"
+                         + "-"*70 + "\n")
+        
+        with open(output_file, 'w', buffering=1 << 16) as f:
+            f.write(''.join(parts))
         
         print(f"Exported {len(unknown_detections)} alerts to {output_file}")
     
     def clear_old_logs(self, days=7):
         """Clear logs older than specified days"""
-        now = datetime.now()
-        cutoff = now - timedelta(days=days)
+        # ISO timestamps compare correctly as strings, so no per-entry datetime parsing
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
         
         filtered = []
         removed_count = 0
         
         for detection in self.detections:
             try:
-                detection_time = datetime.fromisoformat(detection['timestamp'])
-                if detection_time > cutoff:
+                if detection['timestamp'] > cutoff:
                     filtered.append(detection)
                 else:
                     removed_count += 1
@@ -190,8 +247,8 @@ class SecurityLogViewer:
         
         if removed_count > 0:
             self.detections = filtered
-            with open(self.log_file, 'w') as f:
-                json.dump(self.detections, f, indent=2)
+            self._index_timestamps()
+            write_log(self.log_file, self.detections)
             print(f"Removed {removed_count} old log entries (older than {days} days)")
         else:
             print("No old logs to remove")
@@ -3,22 +3,44 @@ Security System with FastAPI Integration
 Reads from ESP32-CAM, sends alerts to ESP32 Buzzer
 """
 
-from ultralytics import YOLO
 import cv2
-from datetime import datetime, timedelta
-import json
+from datetime import datetime
+import orjson
 import os
 import numpy as np
-import imagehash
-from PIL import Image
 import requests
-from threading import Thread, Event
+from requests.adapters import HTTPAdapter
+from threading import Thread, Event, Lock
+from collections import deque
+from queue import Queue, Empty, Full
+from concurrent.futures import ThreadPoolExecutor
 import time
 import logging
+from model_utils import load_yolo, predict_args
+from log_io import read_log, write_log
+from hash_index import BKTree
+from camera_manager import open_capture
+
+# cv2.img_hash ships with opencv-contrib-python; plain opencv-python uses the matrix pHash below
+HAS_IMG_HASH = hasattr(cv2, 'img_hash')
+
+# First 8 rows of the orthonormal 32-point DCT-II (same scaling as cv2.dct). pHash only keeps
+# the low 8x8 block, so PHASH_DCT @ gray32 @ PHASH_DCT.T skips the 24 unused rows and columns
+_k = np.arange(8, dtype=np.float64)[:, None]
+_n = np.arange(32, dtype=np.float64)[None, :]
+PHASH_DCT = np.sqrt(2 / 32) * np.cos(np.pi * (2 * _n + 1) * _k / 64)
+PHASH_DCT[0] /= np.sqrt(2)
+PHASH_DCT = PHASH_DCT.astype(np.float32)
+del _k, _n
 
 logger = logging.getLogger(__name__)
 
 class SecuritySystem:
+    # Overlay constants, resolved once instead of per box
+    FONT = cv2.FONT_HERSHEY_SIMPLEX
+    KNOWN_COLORS = {True: (0, 255, 0), False: (0, 0, 255)}
+    PENDING_COLOR = (0, 255, 255)
+    
     def __init__(
         self,
         esp32_cam_url,
@@ -30,7 +52,14 @@ class SecuritySystem:
         save_images=True,
         images_dir='security_images',
         alert_cooldown=30,
-        camera_manager=None
+        camera_manager=None,
+        frame_skip=5,
+        export_format=None,
+        imgsz=640,
+        person_imgsz=320,
+        face_batch=8,
+        int8=False,
+        calibration_data=None
     ):
         """
         Initialize security system with ESP32 integration
@@ -46,6 +75,13 @@ class SecuritySystem:
             images_dir: Directory to save images
             alert_cooldown: Seconds between alerts
             camera_manager: CameraManager instance for camera access
+            frame_skip: Run detection on every Nth frame
+            export_format: Optional fixed-shape export to run the models through (e.g. "openvino")
+            imgsz: Face model input size, used when exporting
+            person_imgsz: Person detector input size (boxes still come back in frame coordinates)
+            face_batch: Most person crops per face model call (the export's batch size)
+            int8: Quantize exported models to INT8
+            calibration_data: Dataset YAML for calibrating the face model's INT8 export
         """
         
         logger.info("Initializing Security System...")
@@ -54,12 +90,20 @@ class SecuritySystem:
         self.esp32_buzzer_url = esp32_buzzer_url
         self.camera_manager = camera_manager
         
+        # FP16 on CUDA roughly doubles throughput for both detectors
+        self.predict_args = predict_args()
+        # Exported engines are compiled with a fixed precision, so build them FP16 too
+        half = bool(self.predict_args)
+        
         logger.info("Loading YOLO models...")
-        self.person_detector = YOLO('yolov8n.pt')
+        self.person_imgsz = person_imgsz
+        self.person_detector = load_yolo('yolov8n.pt', export_format, person_imgsz, half=half, int8=int8)
         self.face_recognizer = None
         
+        self.face_batch = face_batch
         if face_model_path and os.path.exists(face_model_path):
-            self.face_recognizer = YOLO(face_model_path)
+            self.face_recognizer = load_yolo(face_model_path, export_format, imgsz, half=half,
+                                             int8=int8, data=calibration_data, batch=face_batch)
             logger.info(f"Face model loaded: {face_model_path}")
         else:
             logger.warning(f"Face model not found: {face_model_path}")
@@ -71,6 +115,7 @@ class SecuritySystem:
         self.save_images = save_images
         self.images_dir = images_dir
         self.alert_cooldown = alert_cooldown
+        self.frame_skip = max(1, frame_skip)
         
         os.makedirs(f"{images_dir}/unknown", exist_ok=True)
         os.makedirs(f"{images_dir}/known", exist_ok=True)
@@ -79,8 +124,12 @@ class SecuritySystem:
         self.next_track_id = 0
         self.max_track_distance = 100
         self.face_cache = {}
+        # Saved face hashes (64-bit ints) -> save info; the BK-tree indexes the keys
+        # so a lookup only visits hashes near the query
         self.saved_hashes = {}
+        self._hash_tree = BKTree()
         self.hash_similarity_threshold = 5
+        self._phasher = cv2.img_hash.PHash_create() if HAS_IMG_HASH else None
         self.save_cooldown_hours = 1
         self.stats = {
             'total_detections': 0,
@@ -91,43 +140,92 @@ class SecuritySystem:
             'alerts_sent': 0,
             'uptime': 0
         }
-        self.log_file = 'security_log.json'
+        # Append-only JSON Lines log: one detection per line, never rewritten
+        self.log_file = 'security_log.jsonl'
         self.detections = self.load_log()
+        # Rolling 24h window of (epoch seconds, type), evicted lazily by get_24h_stats
+        self._recent = deque()
+        self._recent_counts = {'known': 0, 'unknown': 0}
+        self._recent_lock = Lock()
+        self._seed_recent()
         self.last_alert_time = {}
         self.stream = None
         self.running = False
         self.stop_event = Event()
+        # Set while no monitoring loop runs, so close() can wait for the loop to exit
+        self._monitor_idle = Event()
+        self._monitor_idle.set()
         self.current_frame = None
+        # Called from the monitoring thread whenever current_frame changes
+        self.on_frame = None
+        # Two reusable annotation buffers: one is published as current_frame
+        # while the next frame is drawn into the other
+        self._frame_buffers = [None, None]
+        self._frame_index = 0
+        self._save_buffer = None
+        # Saved images are encoded inline but written to disk off the inference thread
+        self.jpeg_quality = 85
+        self._io_pool = ThreadPoolExecutor(max_workers=2)
+        # Buzzer alerts go out on their own thread over one kept-alive connection
+        self._http = requests.Session()
+        self._http.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self._alert_pool = ThreadPoolExecutor(max_workers=1)
         self.start_time = time.time()
         
         logger.info("Security System initialized successfully")
     
     def load_log(self):
-        """Load detection log"""
+        """Load detection log, migrating the legacy JSON array log on first run"""
         if os.path.exists(self.log_file):
-            with open(self.log_file, 'r') as f:
-                return json.load(f)
-        return []
+            return read_log(self.log_file)
+        
+        legacy_file = os.path.splitext(self.log_file)[0] + '.json'
+        if not os.path.exists(legacy_file):
+            return []
+        detections = read_log(legacy_file)
+        write_log(self.log_file, detections)
+        os.replace(legacy_file, legacy_file + '.bak')
+        logger.info(f"Migrated {len(detections)} detections to {self.log_file} (old log kept as {legacy_file}.bak)")
+        return detections
     
-    def save_log(self):
-        """Save detection log"""
-        with open(self.log_file, 'w') as f:
-            json.dump(self.detections, f, indent=2)
+    def _seed_recent(self):
+        """Fill the rolling 24h window from the loaded log (once, at startup)"""
+        cutoff = time.time() - 24 * 3600
+        for detection in self.detections:
+            try:
+                ts = datetime.fromisoformat(detection['timestamp']).timestamp()
+            except:
+                continue
+            if ts > cutoff:
+                self._push_recent(ts, detection['type'])
+    
+    def _push_recent(self, ts, detection_type):
+        """Add one detection to the rolling 24h window"""
+        kind = 'unknown' if detection_type == 'unknown' else 'known'
+        with self._recent_lock:
+            self._recent.append((ts, kind))
+            self._recent_counts[kind] += 1
     
-    def log_detection(self, detection_type, confidence, timestamp, image_path=None):
-        """Log a detection"""
+    def log_detection(self, detection_type, confidence, now_ts, image_path=None):
+        """Log a detection (now_ts is a time.time() float, formatted only here)"""
+        timestamp = datetime.fromtimestamp(now_ts)
+        iso = timestamp.isoformat()
         detection = {
             'id': len(self.detections),
             'type': detection_type,
             'confidence': float(confidence),
-            'timestamp': timestamp.isoformat(),
-            'date': timestamp.strftime('%Y-%m-%d'),
-            'time': timestamp.strftime('%H:%M:%S'),
+            'timestamp': iso,
+            'date': iso[:10],
+            'time': iso[11:19],
             'image_path': image_path
         }
         
         self.detections.append(detection)
-        self.save_log()
+        # Reopened per append (detections are rare) so a log pruned and swapped in
+        # by the control scripts is picked up instead of writing to the old inode
+        with open(self.log_file, 'ab') as f:
+            f.write(orjson.dumps(detection) + b'\n')
+        self._push_recent(now_ts, detection_type)
         self.stats['total_detections'] += 1
         if detection_type == 'known':
             self.stats['known_detections'] += 1
@@ -142,7 +240,7 @@ class SecuritySystem:
         logger.info(f"Connecting to ESP32-CAM: {self.esp32_cam_url}")
         
         try:
-            self.stream = cv2.VideoCapture(self.esp32_cam_url)
+            self.stream = open_capture(self.esp32_cam_url)
             
             if self.stream.isOpened():
                 logger.info("Successfully connected to ESP32-CAM")
@@ -155,173 +253,193 @@ class SecuritySystem:
             return False
     
     def send_alert_to_buzzer(self, pattern=1):
-        """Send alert to ESP32 buzzer"""
+        """Queue an alert to the ESP32 buzzer without blocking frame processing"""
+        url = f"{self.esp32_buzzer_url}?pattern={pattern}"
+        future = self._alert_pool.submit(self._http.get, url, timeout=2)
+        future.add_done_callback(lambda f: self._on_buzzer_response(f, pattern))
+        return future
+    
+    def _on_buzzer_response(self, future, pattern):
+        """Log the buzzer's answer (runs on the alert thread)"""
         try:
-            url = f"{self.esp32_buzzer_url}?pattern={pattern}"
-            response = requests.get(url, timeout=5)
-            
-            if response.status_code == 200:
-                logger.info(f"Alert sent to buzzer (pattern {pattern})")
-                self.stats['alerts_sent'] += 1
-                return True
-            else:
-                logger.error(f"Buzzer alert failed: {response.status_code}")
-                return False
+            response = future.result()
         except Exception as e:
             logger.error(f"Error sending alert to buzzer: {e}")
-            return False
+            return
+        
+        if response.status_code == 200:
+            logger.info(f"Alert sent to buzzer (pattern {pattern})")
+            self.stats['alerts_sent'] += 1
+        else:
+            logger.error(f"Buzzer alert failed: {response.status_code}")
     
     def compute_face_hash(self, face_crop):
-        """Compute perceptual hash of face"""
+        """Compute perceptual hash of face as a 64-bit int"""
         try:
-            face_rgb = cv2.cvtColor(face_crop, cv2.COLOR_BGR2RGB)
-            pil_image = Image.fromarray(face_rgb)
-            face_hash = imagehash.phash(pil_image)
-            return face_hash
+            if self._phasher is not None:
+                # DCT runs in C++ directly on the BGR crop, no PIL round trip
+                return int.from_bytes(self._phasher.compute(face_crop).tobytes(), 'big')
+            # Same pHash as imagehash: 32x32 grayscale, DCT, low 8x8 block against its median
+            gray = cv2.cvtColor(face_crop, cv2.COLOR_BGR2GRAY)
+            small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+            low = PHASH_DCT @ small @ PHASH_DCT.T
+            return int.from_bytes(np.packbits(low > np.median(low)).tobytes(), 'big')
         except:
             return None
     
-    def is_duplicate_face(self, face_hash):
-        """Check if face was already saved recently"""
+    def is_duplicate_face(self, face_hash, now_ts):
+        """Check if face was already saved recently (time_since is in seconds)"""
         if face_hash is None:
             return False, None
         
-        now = datetime.now()
-        hash_str = str(face_hash)
+        cooldown = self.save_cooldown_hours * 3600
+        time_since = None
         
-        for saved_hash_str, info in list(self.saved_hashes.items()):
-            saved_hash = imagehash.hex_to_hash(saved_hash_str)
-            distance = face_hash - saved_hash
+        for _, saved_hash in self._hash_tree.find(face_hash, self.hash_similarity_threshold):
+            info = self.saved_hashes.get(saved_hash)
+            if info is None:
+                # Expired earlier; the tree keeps the node until the next rebuild
+                continue
             
-            if distance <= self.hash_similarity_threshold:
-                time_since = now - info['timestamp']
-                hours_since = time_since.total_seconds() / 3600
-                
-                if hours_since < self.save_cooldown_hours:
-                    return True, time_since
-                else:
-                    del self.saved_hashes[saved_hash_str]
-                    return False, time_since
+            time_since = now_ts - info['timestamp']
+            
+            if time_since < cooldown:
+                return True, time_since
+            del self.saved_hashes[saved_hash]
         
-        return False, None
+        # BK-trees can't delete, so rebuild once expired nodes outnumber live ones
+        if len(self._hash_tree) > 2 * len(self.saved_hashes) + 64:
+            self._hash_tree = BKTree(items=self.saved_hashes)
+        
+        return False, time_since
     
-    def add_face_hash(self, face_hash, track_id, person_type):
+    def add_face_hash(self, face_hash, track_id, person_type, now_ts):
         """Add face hash to saved hashes"""
         if face_hash is not None:
-            hash_str = str(face_hash)
-            self.saved_hashes[hash_str] = {
-                'timestamp': datetime.now(),
+            self.saved_hashes[face_hash] = {
+                'timestamp': now_ts,
                 'track_id': track_id,
                 'person_type': person_type
             }
+            self._hash_tree.add(face_hash)
     
-    def save_detection_image(self, frame, person_info, person_type):
+    def save_detection_image(self, frame, person_info, person_type, now_ts):
         """Save detection image"""
         if not self.save_images:
             return None
         
         x1, y1, x2, y2 = person_info['bbox']
-        face_crop = frame[y1:y2, x1:x2]
-        
-        if face_crop.size == 0:
-            return None
+        # Non-empty by construction: detect_and_classify drops empty crops
+        face_crop = person_info['crop']
         face_hash = self.compute_face_hash(face_crop)
-        is_duplicate, time_since = self.is_duplicate_face(face_hash)
+        is_duplicate, time_since = self.is_duplicate_face(face_hash, now_ts)
         
         if is_duplicate:
-            minutes_ago = time_since.total_seconds() / 60
+            minutes_ago = time_since / 60
             logger.info(f"Skipping save: Same person detected {minutes_ago:.1f} min ago")
             return None
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        now = datetime.fromtimestamp(now_ts)
+        # Everyone confirmed in one frame shares now_ts, so the track id keeps their files apart
+        timestamp = f"{now.strftime('%Y%m%d_%H%M%S_%f')}_t{person_info['track_id']}"
         subfolder = 'unknown' if person_type == 'unknown' else 'known'
         full_frame_path = os.path.join(self.images_dir, subfolder, f'full_{timestamp}.jpg')
-        annotated = frame.copy()
-        color = (0, 0, 255) if person_type == 'unknown' else (0, 255, 0)
+        # Reused scratch buffer: the saved frame is encoded before the next save needs it
+        if self._save_buffer is None or self._save_buffer.shape != frame.shape:
+            self._save_buffer = np.empty_like(frame)
+        annotated = self._save_buffer
+        np.copyto(annotated, frame)
+        color = self.KNOWN_COLORS[person_type != 'unknown']
         cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 3)
         
         label = f"{person_type.upper()}: {person_info['confidence']:.2f}"
         cv2.putText(annotated, label, (x1, y1 - 10),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+                   self.FONT, 0.9, color, 2)
         
-        timestamp_text = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        timestamp_text = now.strftime('%Y-%m-%d %H:%M:%S')
         cv2.putText(annotated, timestamp_text, (10, 30),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                   self.FONT, 0.7, (255, 255, 255), 2)
         
-        cv2.imwrite(full_frame_path, annotated)
+        encode_params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        ok, full_jpeg = cv2.imencode('.jpg', annotated, encode_params)
+        if ok:
+            self._io_pool.submit(self._write_file, full_frame_path, full_jpeg)
         
         crop_path = os.path.join(self.images_dir, subfolder, f'crop_{timestamp}.jpg')
-        if face_crop.size > 0:
-            cv2.imwrite(crop_path, face_crop)
+        ok, crop_jpeg = cv2.imencode('.jpg', face_crop, encode_params)
+        if ok:
+            self._io_pool.submit(self._write_file, crop_path, crop_jpeg)
         
-        self.add_face_hash(face_hash, person_info['track_id'], person_type)
+        self.add_face_hash(face_hash, person_info['track_id'], person_type, now_ts)
         
         self.stats['images_saved'] += 1
         logger.info(f"Image saved: {full_frame_path}")
         
         return full_frame_path
     
-    def calculate_iou(self, box1, box2):
-        """Calculate IoU between two boxes"""
-        x1_min, y1_min, x1_max, y1_max = box1
-        x2_min, y2_min, x2_max, y2_max = box2
-        
-        inter_x_min = max(x1_min, x2_min)
-        inter_y_min = max(y1_min, y2_min)
-        inter_x_max = min(x1_max, x2_max)
-        inter_y_max = min(y1_max, y2_max)
-        
-        if inter_x_max < inter_x_min or inter_y_max < inter_y_min:
-            return 0.0
-        
-        inter_area = (inter_x_max - inter_x_min) * (inter_y_max - inter_y_min)
-        box1_area = (x1_max - x1_min) * (y1_max - y1_min)
-        box2_area = (x2_max - x2_min) * (y2_max - y2_min)
-        union_area = box1_area + box2_area - inter_area
-        
-        return inter_area / union_area if union_area > 0 else 0.0
+    @staticmethod
+    def _write_file(path, data):
+        """Write encoded image bytes (runs on the I/O pool)"""
+        try:
+            with open(path, 'wb') as f:
+                f.write(data)
+        except OSError as e:
+            logger.error(f"Failed to write {path}: {e}")
     
-    def match_detection_to_track(self, bbox, frame_number):
-        """Match detection to existing track"""
-        best_match_id = None
-        best_iou = 0.4
-        
-        for track_id, track_info in self.tracked_persons.items():
-            if frame_number - track_info['last_seen'] > 30:
-                continue
-            
-            iou = self.calculate_iou(bbox, track_info['bbox'])
-            if iou > best_iou:
-                best_iou = iou
-                best_match_id = track_id
-        
-        return best_match_id
+    def match_detections_to_tracks(self, bboxes, frame_number):
+        """Match every detection to its best active track with one IoU matrix (D x T)"""
+        active = [(track_id, track_info['bbox']) for track_id, track_info in self.tracked_persons.items()
+                  if frame_number - track_info['last_seen'] <= 30]
+        if not bboxes or not active:
+            return [None] * len(bboxes)
+        
+        track_ids = [track_id for track_id, _ in active]
+        tracks = np.asarray([bbox for _, bbox in active], dtype=np.float32)
+        dets = np.asarray(bboxes, dtype=np.float32)
+        
+        inter_w = np.minimum(dets[:, None, 2], tracks[None, :, 2]) - np.maximum(dets[:, None, 0], tracks[None, :, 0])
+        inter_h = np.minimum(dets[:, None, 3], tracks[None, :, 3]) - np.maximum(dets[:, None, 1], tracks[None, :, 1])
+        inter = np.clip(inter_w, 0, None) * np.clip(inter_h, 0, None)
+        
+        det_area = (dets[:, 2] - dets[:, 0]) * (dets[:, 3] - dets[:, 1])
+        track_area = (tracks[:, 2] - tracks[:, 0]) * (tracks[:, 3] - tracks[:, 1])
+        union = det_area[:, None] + track_area[None, :] - inter
+        iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+        
+        best = iou.argmax(axis=1)
+        return [track_ids[j] if iou[i, j] > 0.4 else None for i, j in enumerate(best)]
     
     def detect_and_classify(self, frame, frame_number):
         """Detect and classify persons"""
         detected_persons = []
         confirmed_persons = []
-        person_results = self.person_detector(frame, classes=[0], conf=self.person_conf, verbose=False)
+        person_results = self.person_detector(frame, classes=[0], conf=self.person_conf, imgsz=self.person_imgsz,
+                                              verbose=False, **self.predict_args)
         frame_height, frame_width = frame.shape[:2]
         min_person_area = (frame_width * frame_height) * 0.02
         persons_to_check = []
         
-        for person_box in person_results[0].boxes:
-            x1, y1, x2, y2 = map(int, person_box.xyxy[0])
-            person_conf = float(person_box.conf[0])
-            
-            bbox_area = (x2 - x1) * (y2 - y1)
-            if bbox_area < min_person_area:
-                self.stats['false_positives_blocked'] += 1
-                continue
-            
+        # Fetch every box in one device->host transfer and filter small ones vectorized
+        boxes = person_results[0].boxes
+        xyxy = boxes.xyxy.cpu().numpy().astype(np.int32)
+        confs = boxes.conf.cpu().numpy()
+        areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+        keep = areas >= min_person_area
+        self.stats['false_positives_blocked'] += int(len(keep) - keep.sum())
+        
+        candidates = []
+        for (x1, y1, x2, y2), person_conf in zip(xyxy[keep].tolist(), confs[keep].tolist()):
             person_crop = frame[y1:y2, x1:x2]
             if person_crop.size == 0:
                 continue
             
-            bbox = (x1, y1, x2, y2)
-            track_id = self.match_detection_to_track(bbox, frame_number)
-            
+            candidates.append(((x1, y1, x2, y2), person_conf, person_crop))
+        
+        # All detections are matched against the tracks in one vectorized pass
+        matches = self.match_detections_to_tracks([bbox for bbox, _, _ in candidates], frame_number)
+        
+        frame_tracks = []
+        for (bbox, person_conf, person_crop), track_id in zip(candidates, matches):
             if track_id is None:
                 track_id = self.next_track_id
                 self.next_track_id += 1
@@ -343,21 +461,29 @@ class SecuritySystem:
                 self.tracked_persons[track_id]['last_seen'] = frame_number
             
             track_info = self.tracked_persons[track_id]
+            frame_tracks.append((bbox, track_id, person_crop))
             
             if track_info['count'] >= self.min_detections:
                 if not self.face_cache[track_id]['checked']:
                     persons_to_check.append((track_id, person_crop, bbox, person_conf))
         
         if persons_to_check and self.face_recognizer is not None:
-            for track_id, person_crop, bbox, person_conf in persons_to_check:
-                face_results = self.face_recognizer(person_crop, conf=self.known_conf, verbose=False)
-                
+            # Batched forward passes for every track awaiting a face check, no larger
+            # than the exported model accepts
+            crops = [person_crop for _, person_crop, _, _ in persons_to_check]
+            face_results = []
+            for start in range(0, len(crops), self.face_batch):
+                face_results.extend(self.face_recognizer(crops[start:start + self.face_batch],
+                                                         conf=self.known_conf, verbose=False,
+                                                         **self.predict_args))
+            
+            for (track_id, person_crop, bbox, person_conf), face_result in zip(persons_to_check, face_results):
                 is_known = False
                 known_conf = 0.0
                 
-                if len(face_results[0].boxes) > 0:
+                if len(face_result.boxes) > 0:
                     is_known = True
-                    known_conf = float(face_results[0].boxes[0].conf[0])
+                    known_conf = float(face_result.boxes.conf[0])
                 
                 self.face_cache[track_id] = {
                     'is_known': is_known,
@@ -367,20 +493,8 @@ class SecuritySystem:
                 
                 self.tracked_persons[track_id]['is_known'] = is_known
         
-        for person_box in person_results[0].boxes:
-            x1, y1, x2, y2 = map(int, person_box.xyxy[0])
-            person_conf = float(person_box.conf[0])
-            
-            bbox_area = (x2 - x1) * (y2 - y1)
-            if bbox_area < min_person_area:
-                continue
-            
-            bbox = (x1, y1, x2, y2)
-            track_id = self.match_detection_to_track(bbox, frame_number)
-            
-            if track_id is None:
-                continue
-            
+        # Emit from the tracks resolved above instead of re-walking and re-matching the boxes
+        for bbox, track_id, person_crop in frame_tracks:
             track_info = self.tracked_persons[track_id]
             face_info = self.face_cache.get(track_id, {'is_known': False, 'confidence': 0.0, 'checked': False})
             
@@ -391,7 +505,8 @@ class SecuritySystem:
                     'confidence': face_info['confidence'],
                     'type': 'known' if face_info['is_known'] else 'unknown',
                     'track_id': track_id,
-                    'detection_count': track_info['count']
+                    'detection_count': track_info['count'],
+                    'crop': person_crop
                 }
                 detected_persons.append(person_info)
                 
@@ -412,94 +527,157 @@ class SecuritySystem:
     def process_frame(self, frame, frame_number):
         """Process single frame"""
         detected_persons, confirmed_persons = self.detect_and_classify(frame, frame_number)
-        annotated = frame.copy()
+        annotated = self._back_buffer(frame)
+        font = self.FONT
+        known_colors = self.KNOWN_COLORS
+        pending_color = self.PENDING_COLOR
         
         for person in detected_persons:
+            x1, y1, x2, y2 = person['bbox']
             if person.get('is_pending'):
-                x1, y1, x2, y2 = person['bbox']
-                cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 255), 2)
+                cv2.rectangle(annotated, (x1, y1), (x2, y2), pending_color, 2)
                 label = f"VERIFYING {person['detection_count']}/{person['required']}"
                 cv2.putText(annotated, label, (x1, y1 - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+                           font, 0.6, pending_color, 2)
             else:
-                x1, y1, x2, y2 = person['bbox']
-                color = (0, 255, 0) if person['is_known'] else (0, 0, 255)
+                color = known_colors[person['is_known']]
                 cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 3)
                 
                 label = f"{'KNOWN' if person['is_known'] else 'UNKNOWN'}: {person['confidence']:.2f}"
                 cv2.putText(annotated, label, (x1, y1 - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+                           font, 0.9, color, 2)
         
-        current_time = datetime.now()
+        now_ts = time.time()
         for person in confirmed_persons:
             track_id = person['track_id']
             
             if track_id in self.last_alert_time:
-                time_since_alert = (current_time - self.last_alert_time[track_id]).total_seconds()
+                time_since_alert = now_ts - self.last_alert_time[track_id]
                 if time_since_alert < self.alert_cooldown:
                     continue
                 
             image_path = None
             if self.save_images:
-                image_path = self.save_detection_image(annotated, person, person['type'])
+                image_path = self.save_detection_image(annotated, person, person['type'], now_ts)
                 
-            self.log_detection(person['type'], person['confidence'], current_time, image_path)
+            self.log_detection(person['type'], person['confidence'], now_ts, image_path)
             
             if not person['is_known']:
                 logger.warning(f"UNKNOWN PERSON DETECTED! Confidence: {person['confidence']:.2f}")
                 self.send_alert_to_buzzer(pattern=1)
-                self.last_alert_time[track_id] = current_time
+                self.last_alert_time[track_id] = now_ts
         
         self.current_frame = annotated
         return annotated
     
-    def start(self):
-        """Start security monitoring"""
-        if not self.connect_to_stream():
-            logger.error("Failed to connect to stream")
-            return
-        
-        self.running = True
-        self.stop_event.clear()
+    def _back_buffer(self, frame):
+        """Copy frame into the annotation buffer that isn't currently published"""
+        index = 1 - self._frame_index
+        buffer = self._frame_buffers[index]
+        if buffer is None or buffer.shape != frame.shape:
+            buffer = self._frame_buffers[index] = np.empty_like(frame)
+        np.copyto(buffer, frame)
+        self._frame_index = index
+        return buffer
+    
+    def _read_frame(self):
+        """Read the next frame from the camera manager or the direct stream"""
+        if self.camera_manager and self.camera_manager.current_camera:
+            return self.camera_manager.read_frame()
+        if self.stream:
+            return self.stream.read()
+        return False, None
+    
+    def _capture_loop(self, frames):
+        """
+        Read frames as fast as the camera delivers them
         
+        Every frame_skip-th frame is offered to the inference loop through a
+        one-slot queue that drops the stale frame when inference is behind;
+        the rest are published directly so the live view keeps camera rate.
+        """
         frame_number = 0
         
-        logger.info("Security monitoring started")
-        
         while self.running and not self.stop_event.is_set():
-            if self.camera_manager and self.camera_manager.current_camera:
-                ret, frame = self.camera_manager.read_frame()
-            elif self.stream:
-                ret, frame = self.stream.read()
-            else:
-                ret = False
-                frame = None
+            ret, frame = self._read_frame()
             
             if not ret or frame is None:
                 logger.warning("Failed to read frame, attempting reconnect...")
-                time.sleep(5)
+                if self.stop_event.wait(5):
+                    break
                 self.connect_to_stream()
                 continue
             
             frame_number += 1
-            if frame_number % 5 == 0:
-                processed_frame = self.process_frame(frame, frame_number)
-                self.current_frame = processed_frame
+            if frame_number % self.frame_skip == 0:
+                try:
+                    frames.put_nowait((frame, frame_number))
+                except Full:
+                    try:
+                        frames.get_nowait()
+                    except Empty:
+                        pass
+                    frames.put_nowait((frame, frame_number))
             else:
                 self.current_frame = frame
+                if self.on_frame:
+                    self.on_frame()
+    
+    def start(self):
+        """Start security monitoring"""
+        self._monitor_idle.clear()
+        try:
+            if not self.connect_to_stream():
+                logger.error("Failed to connect to stream")
+                return
             
-            self.stats['uptime'] = int(time.time() - self.start_time)
-        
-        logger.info("Security monitoring stopped")
-        
-        if self.stream:
-            self.stream.release()
+            self.running = True
+            self.stop_event.clear()
+            
+            # Capture runs on its own thread so slow inference never backs up the stream
+            frames = Queue(maxsize=1)
+            capture_thread = Thread(target=self._capture_loop, args=(frames,), daemon=True)
+            capture_thread.start()
+            
+            logger.info("Security monitoring started")
+            
+            while self.running and not self.stop_event.is_set():
+                try:
+                    frame, frame_number = frames.get(timeout=1)
+                except Empty:
+                    continue
+                
+                self.current_frame = self.process_frame(frame, frame_number)
+                if self.on_frame:
+                    self.on_frame()
+                
+                self.stats['uptime'] = int(time.time() - self.start_time)
+            
+            capture_thread.join(timeout=5)
+            logger.info("Security monitoring stopped")
+            
+            if self.stream:
+                self.stream.release()
+        finally:
+            self._monitor_idle.set()
     
     def stop(self):
         """Stop security monitoring"""
         self.running = False
         self.stop_event.set()
     
+    def close(self, timeout=10):
+        """Stop monitoring and release the writer/alert threads and the buzzer connection"""
+        self.stop()
+        # The monitoring thread may be mid-frame and about to submit a save or alert;
+        # shutting the pools down under it would kill it before it releases the stream
+        if not self._monitor_idle.wait(timeout):
+            logger.warning("Monitoring thread did not stop in time; closing anyway")
+        # Queued image writes and alerts still finish; nothing waits for them
+        self._io_pool.shutdown(wait=False)
+        self._alert_pool.shutdown(wait=False)
+        self._http.close()
+    
     def get_frame_stream(self):
         """Generator for frame streaming"""
         while self.running:
@@ -516,22 +694,14 @@ class SecuritySystem:
     
     def get_24h_stats(self):
         """Get 24-hour statistics"""
-        now = datetime.now()
-        cutoff = now - timedelta(hours=24)
-        
-        unknown = 0
-        known = 0
-        
-        for detection in self.detections:
-            try:
-                det_time = datetime.fromisoformat(detection['timestamp'])
-                if det_time > cutoff:
-                    if detection['type'] == 'unknown':
-                        unknown += 1
-                    else:
-                        known += 1
-            except:
-                continue
+        cutoff = time.time() - 24 * 3600
+        
+        with self._recent_lock:
+            while self._recent and self._recent[0][0] <= cutoff:
+                _, kind = self._recent.popleft()
+                self._recent_counts[kind] -= 1
+            unknown = self._recent_counts['unknown']
+            known = self._recent_counts['known']
         
         return {'unknown': unknown, 'known': known, 'total': unknown + known}
     
@@ -248,12 +248,12 @@ async function startAutoCapture() {
 }
 
 async function manualCapture() {
-    await captureFrame();
+    await captureFrame(true);
 }
 
-async function captureFrame() {
+async function captureFrame(manual = false) {
     try {
-        const response = await fetch('/api/training/capture-frame', {
+        const response = await fetch(`/api/training/capture-frame?manual=${manual}`, {
             method: 'POST'
         });
         
@@ -264,6 +264,11 @@ async function captureFrame() {
             return;
         }
         
+        // Near-duplicate of the previous auto-captured frame; nothing new to show
+        if (result.skipped) {
+            return;
+        }
+        
         // Update progress
         document.getElementById('capture-count').textContent = result.captured;
         const progress = (result.captured / result.target) * 100;
@@ -7,6 +7,8 @@ import os
 import json
 import time
 import threading
+from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import shutil
@@ -14,11 +16,63 @@ import cv2
 import numpy as np
 from ultralytics import YOLO
 import logging
+from hash_index import hamming_distance
+from file_utils import link_or_copy
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Capture file formats: extension and imencode params. Dataset images are kept, so JPEG
+# quality stays high; BMP skips compression entirely and PNG uses the cheap RLE strategy,
+# trading disk space for encoder CPU (YOLO decodes and augments them either way)
+CAPTURE_FORMATS = {
+    "jpg": ('.jpg', [int(cv2.IMWRITE_JPEG_QUALITY), 92]),
+    "bmp": ('.bmp', []),
+    "png": ('.png', [int(cv2.IMWRITE_PNG_COMPRESSION), 1,
+                     int(cv2.IMWRITE_PNG_STRATEGY), int(cv2.IMWRITE_PNG_STRATEGY_RLE)]),
+}
+IMAGE_EXTENSIONS = tuple(ext for ext, _ in CAPTURE_FORMATS.values())
+
+
+def _read_json(path):
+    """Parse a JSON file in one read (orjson when installed)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _write_json(path, obj):
+    """Write obj as indented JSON in one write (orjson when installed)"""
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(obj, indent=2).encode()
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class CaptureSession:
+    """One capture run: its dataset, frame counter and write queue"""
+    __slots__ = ("dataset_name", "dataset_path", "count", "write_queue")
+    
+    def __init__(self, dataset_name, dataset_path):
+        self.dataset_name = dataset_name
+        self.dataset_path = dataset_path
+        self.count = 0
+        # Per run, so a stop's sentinels can't reach the writers of a run started right after
+        self.write_queue = Queue(maxsize=64)
+
+
 class TrainingManager:
-    def __init__(self, base_dir="training_data", models_dir="models"):
+    # Seconds between metadata flushes while a capture is running
+    METADATA_FLUSH_INTERVAL = 2
+    
+    def __init__(self, base_dir="training_data", models_dir="models", capture_format="jpg", capture_writers=2,
+                 dedup_distance=5):
         self.base_dir = Path(base_dir)
         self.models_dir = Path(models_dir)
         self.base_dir.mkdir(exist_ok=True)
@@ -29,9 +83,20 @@ class TrainingManager:
         self.capture_thread = None
         self.capture_person = None
         self.capture_camera = None
-        self.captured_count = 0
+        self._session = None
+        # Frames whose dHash is closer than this to the last kept frame are skipped (0 keeps all)
+        self.dedup_distance = dedup_distance
+        self._last_hash = None
         self.target_count = 300
         self.auto_capture = False
+        self._overlay_cache = {}
+        self.capture_ext, self._encode_params = CAPTURE_FORMATS[capture_format]
+        # Captured frames are encoded and written by writer threads, off the request path.
+        # cv2.imencode releases the GIL, so several writers encode on separate cores
+        self.capture_writers = max(1, capture_writers)
+        self._writer_threads = []
+        # Request threads may overlap; capture/stop must not interleave
+        self._capture_lock = threading.Lock()
         
         # Training state
         self.training = False
@@ -47,41 +112,78 @@ class TrainingManager:
         
         # Metadata file
         self.metadata_file = self.base_dir / "metadata.json"
+        self._metadata_lock = threading.Lock()
+        self._metadata_dirty = False
+        # Per-model metadata.json contents keyed by path, valid while mtime_ns is unchanged
+        self._model_meta_cache = {}
         self.load_metadata()
     
     def load_metadata(self):
         """Load datasets metadata"""
         if self.metadata_file.exists():
-            with open(self.metadata_file, 'r') as f:
-                self.metadata = json.load(f)
+            self.metadata = _read_json(self.metadata_file)
         else:
             self.metadata = {"datasets": {}}
     
     def save_metadata(self):
-        """Save datasets metadata"""
-        with open(self.metadata_file, 'w') as f:
-            json.dump(self.metadata, f, indent=2)
+        """Save datasets metadata (written to a temp file and swapped in, so never half-written)"""
+        with self._metadata_lock:
+            self._metadata_dirty = False
+            self._sync_capture_count()
+            tmp_file = self.metadata_file.with_name(self.metadata_file.name + '.tmp')
+            _write_json(tmp_file, self.metadata)
+            os.replace(tmp_file, self.metadata_file)
     
     # ==================== DATA COLLECTION ====================
     
+    @property
+    def captured_count(self):
+        """Frames captured in the current (or last) capture run"""
+        return self._session.count if self._session is not None else 0
+    
+    def _sync_capture_count(self):
+        """Copy the live capture counter into the dataset's metadata entry"""
+        session = self._session
+        if session is not None:
+            info = self.metadata["datasets"].get(session.dataset_name)
+            if info is not None:
+                info["count"] = session.count
+    
     def start_capture(self, person_name, camera_source, auto=True, target=300):
         """Start capturing images for a person"""
         if self.capturing:
             return {"error": "Already capturing"}
         
-        # Create dataset directory
+        # Create dataset directory. Image names restart at img_000000 every run, so a
+        # restart within the same second must get a fresh folder, not reuse this one
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        dataset_name = f"{person_name.lower().replace(' ', '_')}_{timestamp}"
-        dataset_path = self.base_dir / dataset_name
-        dataset_path.mkdir(exist_ok=True)
+        base_name = f"{person_name.lower().replace(' ', '_')}_{timestamp}"
+        dataset_name = base_name
+        suffix = 1
+        while True:
+            dataset_path = self.base_dir / dataset_name
+            try:
+                dataset_path.mkdir()
+                break
+            except FileExistsError:
+                suffix += 1
+                dataset_name = f"{base_name}_{suffix}"
         
         self.capture_person = person_name
         self.capture_camera = camera_source
-        self.captured_count = 0
+        self._session = CaptureSession(dataset_name, dataset_path)
+        self._last_hash = None
         self.target_count = target
         self.auto_capture = auto
         self.capturing = True
-        self.dataset_path = dataset_path
+        
+        # Only the first writer flushes metadata
+        self._writer_threads = [
+            threading.Thread(target=self._writer_loop, args=(self._session.write_queue, index == 0), daemon=True)
+            for index in range(self.capture_writers)
+        ]
+        for thread in self._writer_threads:
+            thread.start()
         
         # Add to metadata
         self.metadata["datasets"][dataset_name] = {
@@ -100,45 +202,136 @@ class TrainingManager:
             "target": target
         }
     
-    def capture_frame(self, frame):
-        """Capture a single frame"""
+    def capture_frame(self, frame, manual=False):
+        """
+        Capture a single frame (blocks while the write queue is full; call it off the event loop)
+        
+        Args:
+            frame: BGR frame to save
+            manual: Requested by the user rather than the auto-capture timer, so never deduplicated
+        """
+        with self._capture_lock:
+            return self._capture_frame(frame, manual)
+    
+    def _capture_frame(self, frame, manual):
         if not self.capturing:
             return {"error": "Not capturing"}
         
-        # Save image
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        filename = f"img_{self.captured_count:04d}_{timestamp}.jpg"
-        filepath = self.dataset_path / filename
+        session = self._session
+        
+        # Auto-capture grabs a frame every 500 ms from the browser; a subject standing
+        # still would fill the dataset with near-identical frames, so only keep frames
+        # that changed. Manual captures are always kept
+        if self.auto_capture and not manual and self.dedup_distance > 0:
+            frame_hash = self._dhash(frame)
+            if self._last_hash is not None and hamming_distance(frame_hash, self._last_hash) < self.dedup_distance:
+                return {
+                    "captured": session.count,
+                    "target": self.target_count,
+                    "complete": False,
+                    "skipped": True
+                }
+            self._last_hash = frame_hash
         
-        cv2.imwrite(str(filepath), frame)
-        self.captured_count += 1
+        # Every run gets a new dataset folder, so the count alone keeps names unique
+        filepath = session.dataset_path / f"img_{session.count:06d}{self.capture_ext}"
         
-        # Update metadata
-        dataset_name = self.dataset_path.name
-        self.metadata["datasets"][dataset_name]["count"] = self.captured_count
+        # read_frame gives every caller its own copy, so the frame can be queued as is;
+        # a full queue blocks here rather than dropping dataset images
+        session.write_queue.put((filepath, frame))
+        # Metadata picks the counter up when it's flushed (writer thread, stop), not per frame
+        session.count += 1
+        self._metadata_dirty = True
         
         # Check if target reached
-        if self.captured_count >= self.target_count:
-            self.stop_capture()
+        if session.count >= self.target_count:
+            self._stop_capture()
             return {
-                "captured": self.captured_count,
+                "captured": session.count,
                 "complete": True,
-                "message": f"Captured {self.captured_count} images!"
+                "message": f"Captured {session.count} images!"
             }
         
         return {
-            "captured": self.captured_count,
+            "captured": session.count,
             "target": self.target_count,
             "complete": False
         }
     
+    @staticmethod
+    def _dhash(frame):
+        """64-bit difference hash: is each pixel brighter than its right neighbour, on a 9x8 thumbnail"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), 'big')
+    
+    def _writer_loop(self, write_queue, flush_metadata):
+        """Encode and write queued captures until stop_capture sends None"""
+        # JPEGs skip the optimized-Huffman and progressive passes: they cost far more
+        # CPU than the few percent of size they save
+        ext, encode_params = self.capture_ext, self._encode_params
+        next_flush = time.monotonic() + self.METADATA_FLUSH_INTERVAL
+        while True:
+            if flush_metadata and time.monotonic() >= next_flush:
+                next_flush = time.monotonic() + self.METADATA_FLUSH_INTERVAL
+                if self._metadata_dirty:
+                    try:
+                        self.save_metadata()
+                    except Exception as e:
+                        # e.g. a dataset deleted mid-dump; the next tick or stop_capture retries
+                        self._metadata_dirty = True
+                        logger.error(f"Failed to save metadata: {e}")
+            
+            try:
+                item = write_queue.get(timeout=self.METADATA_FLUSH_INTERVAL)
+            except Empty:
+                continue
+            if item is None:
+                return
+            
+            filepath, frame = item
+            try:
+                ok, buffer = cv2.imencode(ext, frame, encode_params)
+                if not ok:
+                    logger.error(f"Failed to encode {filepath}")
+                    continue
+                with open(filepath, 'wb') as f:
+                    f.write(buffer)
+            except Exception as e:
+                logger.error(f"Failed to write {filepath}: {e}")
+    
+    def capture_overlay(self):
+        """Get the "Capturing: X/Y" preview text as a sprite, rendered once per count"""
+        key = (self.captured_count, self.target_count)
+        sprite = self._overlay_cache.get(key)
+        if sprite is None:
+            sprite = np.zeros((40, 400, 3), dtype=np.uint8)
+            cv2.putText(sprite, f"Capturing: {key[0]}/{key[1]}", (10, 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            # Only the current count is ever drawn again
+            self._overlay_cache = {key: sprite}
+        return sprite
+    
     def stop_capture(self):
-        """Stop capturing"""
+        """Stop capturing (waits for queued writes; call it off the event loop)"""
+        with self._capture_lock:
+            return self._stop_capture()
+    
+    def _stop_capture(self):
         if not self.capturing:
             return {"error": "Not capturing"}
         
+        # Taken before capturing flips, so a start_capture right after can't swap them out
+        writers, self._writer_threads = self._writer_threads, []
+        session = self._session
+        dataset_name = session.dataset_name
         self.capturing = False
-        dataset_name = self.dataset_path.name
+        
+        # Drain pending writes so the dataset is complete on disk once this returns
+        for _ in writers:
+            session.write_queue.put(None)
+        for thread in writers:
+            thread.join()
         
         # Update metadata
         self.metadata["datasets"][dataset_name]["status"] = "complete"
@@ -154,15 +347,21 @@ class TrainingManager:
     def get_datasets(self):
         """Get all datasets"""
         datasets = []
+        backfilled = False
+        self._sync_capture_count()
         
         for dataset_name, info in self.metadata["datasets"].items():
             dataset_path = self.base_dir / dataset_name
             
-            # Count actual images
-            if dataset_path.exists():
-                image_count = len(list(dataset_path.glob("*.jpg")))
-            else:
+            # capture_frame keeps "count" current; only legacy entries without one are scanned (once)
+            if not dataset_path.exists():
                 image_count = 0
+            elif "count" in info:
+                image_count = info["count"]
+            else:
+                image_count = self._count_images(dataset_path)
+                info["count"] = image_count
+                backfilled = True
             
             datasets.append({
                 "name": dataset_name,
@@ -174,8 +373,17 @@ class TrainingManager:
                 "path": str(dataset_path)
             })
         
+        if backfilled:
+            self.save_metadata()
+        
         return datasets
     
+    @staticmethod
+    def _count_images(dataset_path):
+        """Count captured images in a dataset folder"""
+        with os.scandir(dataset_path) as entries:
+            return sum(1 for entry in entries if entry.name.endswith(IMAGE_EXTENSIONS) and entry.is_file())
+    
     def delete_dataset(self, dataset_name):
         """Delete a dataset"""
         dataset_path = self.base_dir / dataset_name
@@ -204,8 +412,15 @@ class TrainingManager:
         # Map person names to class IDs
         persons = list(set([d["person"] for d in selected_datasets if d["person"] != "negatives"]))
         class_mapping = {person: idx for idx, person in enumerate(persons)}
-        
-        # Copy and annotate images
+        # Every image of a person gets the same label, so encode each one once
+        # Full image bbox: center_x, center_y, width, height (normalized)
+        label_bytes = {person: f"{class_id} 0.5 0.5 0.8 0.8\n".encode()
+                       for person, class_id in class_mapping.items()}
+        
+        # Collect every (image, label) to stage, then stage them in parallel: it's all file I/O
+        images_dir = output_path / "images" / "train"
+        labels_dir = output_path / "labels" / "train"
+        tasks = []
         for dataset in selected_datasets:
             dataset_path = Path(dataset["path"])
             person = dataset["person"]
@@ -213,25 +428,27 @@ class TrainingManager:
             if not dataset_path.exists():
                 continue
             
-            for img_file in dataset_path.glob("*.jpg"):
-                # Copy image
-                dest_img = output_path / "images" / "train" / f"{dataset['name']}_{img_file.name}"
-                shutil.copy(img_file, dest_img)
+            with os.scandir(dataset_path) as entries:
+                img_files = [entry for entry in entries
+                             if entry.name.endswith(IMAGE_EXTENSIONS) and entry.is_file()]
+            
+            for img_file in img_files:
+                dest_img = images_dir / f"{dataset['name']}_{img_file.name}"
+                label_file = labels_dir / f"{dataset['name']}_{os.path.splitext(img_file.name)[0]}.txt"
                 
-                # Create label file
                 if person != "negatives":
                     # For positive samples, create bounding box annotation
                     # Using full image as bounding box (will be refined by auto-annotation)
-                    label_file = output_path / "labels" / "train" / f"{dataset['name']}_{img_file.stem}.txt"
-                    
-                    class_id = class_mapping[person]
-                    # Full image bbox: center_x, center_y, width, height (normalized)
-                    with open(label_file, 'w') as f:
-                        f.write(f"{class_id} 0.5 0.5 0.8 0.8\n")
+                    label = label_bytes[person]
                 else:
-                    # For negatives, create empty label file
-                    label_file = output_path / "labels" / "train" / f"{dataset['name']}_{img_file.stem}.txt"
-                    label_file.touch()
+                    # For negatives, an empty label file
+                    label = b""
+                
+                tasks.append((img_file, dest_img, label_file, label))
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            # list() surfaces the first staging error instead of dropping it
+            list(executor.map(self._stage_image, tasks))
         
         # Create data.yaml
         yaml_content = f"""
@@ -252,8 +469,16 @@ names: {persons}
             "class_mapping": class_mapping
         }
     
-    def start_training(self, model_name, selected_datasets, epochs=100, batch=16, imgsz=640):
-        """Start model training in background"""
+    @staticmethod
+    def _stage_image(task):
+        """Link one image into the YOLO dataset and write its label (runs on the staging pool)"""
+        img_file, dest_img, label_file, label = task
+        # Link image (captures are never modified, so sharing the inode is safe)
+        link_or_copy(img_file, dest_img)
+        label_file.write_bytes(label)
+    
+    def start_training(self, model_name, selected_datasets, epochs=100, batch=-1, imgsz=640):
+        """Start model training in background (batch=-1 sizes the batch to the GPU's memory)"""
         if self.training:
             return {"error": "Already training"}
         
@@ -289,6 +514,9 @@ names: {persons}
             # Initialize model
             self.training_progress["status"] = "training"
             model = YOLO('yolov8n.pt')  # Start from pretrained
+            # Progress comes from one callback per epoch instead of per-batch console logging
+            self._train_started = time.monotonic()
+            model.add_callback("on_fit_epoch_end", self._on_fit_epoch_end)
             
             # Train
             results = model.train(
@@ -296,10 +524,14 @@ names: {persons}
                 epochs=epochs,
                 batch=batch,
                 imgsz=imgsz,
+                amp=True,
+                # Decoded images stay in RAM across epochs (Ultralytics falls back if it won't fit)
+                cache='ram',
+                workers=max(4, (os.cpu_count() or 8) // 2),
                 project=str(self.models_dir),
                 name=model_name,
                 exist_ok=True,
-                verbose=True
+                verbose=False
             )
             
             # Save metadata
@@ -310,7 +542,7 @@ names: {persons}
                 "classes": dataset_info["classes"],
                 "class_mapping": dataset_info["class_mapping"],
                 "epochs": epochs,
-                "batch": batch,
+                "batch": batch if batch > 0 else "auto",
                 "imgsz": imgsz,
                 "datasets": [d["name"] for d in selected_datasets],
                 "cameras": list(set([d["camera"] for d in selected_datasets])),
@@ -321,8 +553,7 @@ names: {persons}
                 }
             }
             
-            with open(model_path / "metadata.json", 'w') as f:
-                json.dump(metadata, f, indent=2)
+            _write_json(model_path / "metadata.json", metadata)
             
             self.training_progress["status"] = "complete"
             self.training_progress["epoch"] = epochs
@@ -336,6 +567,19 @@ names: {persons}
         finally:
             self.training = False
     
+    def _on_fit_epoch_end(self, trainer):
+        """Ultralytics callback: publish epoch, loss, mAP and ETA for the UI to poll"""
+        epoch = trainer.epoch + 1
+        elapsed = time.monotonic() - self._train_started
+        remaining = elapsed / epoch * (trainer.epochs - epoch)
+        self.training_progress.update(
+            epoch=epoch,
+            total_epochs=trainer.epochs,
+            loss=float(trainer.tloss.sum()) if trainer.tloss is not None else 0,
+            map=float(trainer.metrics.get('metrics/mAP50(B)', 0)),
+            eta=f"{int(remaining // 60)}m {int(remaining % 60)}s"
+        )
+    
     def get_training_progress(self):
         """Get current training progress"""
         return self.training_progress
@@ -350,21 +594,30 @@ names: {persons}
         """Get all trained models"""
         models = []
         
-        for model_dir in self.models_dir.iterdir():
-            if not model_dir.is_dir():
-                continue
-            
-            weights_file = model_dir / "weights" / "best.pt"
-            metadata_file = model_dir / "metadata.json"
+        # DirEntry.is_dir() comes from the directory listing itself, no stat per child
+        with os.scandir(self.models_dir) as entries:
+            model_dirs = [entry for entry in entries if entry.is_dir(follow_symlinks=False)]
+        
+        for model_dir in model_dirs:
+            weights_file = os.path.join(model_dir.path, "weights", "best.pt")
+            metadata_file = os.path.join(model_dir.path, "metadata.json")
             
-            if not weights_file.exists():
+            # One stat both checks the weights exist and sizes them
+            try:
+                weights_size = os.stat(weights_file).st_size
+            except FileNotFoundError:
                 continue
             
-            # Load metadata
-            if metadata_file.exists():
-                with open(metadata_file, 'r') as f:
-                    metadata = json.load(f)
-            else:
+            # Load metadata, re-parsing only files written since the last call
+            try:
+                mtime = os.stat(metadata_file).st_mtime_ns
+                cached = self._model_meta_cache.get(metadata_file)
+                if cached is not None and cached[0] == mtime:
+                    metadata = cached[1]
+                else:
+                    metadata = _read_json(metadata_file)
+                    self._model_meta_cache[metadata_file] = (mtime, metadata)
+            except FileNotFoundError:
                 metadata = {
                     "name": model_dir.name,
                     "created": "Unknown",
@@ -374,13 +627,13 @@ names: {persons}
             
             models.append({
                 "name": model_dir.name,
-                "path": str(weights_file),
+                "path": weights_file,
                 "created": metadata.get("created", "Unknown"),
                 "classes": metadata.get("classes", []),
                 "cameras": metadata.get("cameras", []),
                 "epochs": metadata.get("epochs", 0),
                 "metrics": metadata.get("metrics", {}),
-                "size_mb": weights_file.stat().st_size / (1024 * 1024)
+                "size_mb": weights_size / (1024 * 1024)
             })
         
         return models
@@ -391,6 +644,7 @@ names: {persons}
         
         if model_path.exists():
             shutil.rmtree(model_path)
+            self._model_meta_cache.pop(os.path.join(model_path, "metadata.json"), None)
             logger.info(f"Deleted model: {model_name}")
             return {"status": "deleted"}
         
@@ -404,5 +658,4 @@ names: {persons}
         if not metadata_file.exists():
             return {"error": "Model not found"}
         
-        with open(metadata_file, 'r') as f:
-            return json.load(f)
\ No newline at end of file
+        return _read_json(metadata_file)
\ No newline at end of file
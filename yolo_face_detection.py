@@ -5,8 +5,79 @@ YOLOv8 Face Detection for Video/Webcam
 from ultralytics import YOLO
 import cv2
 import argparse
+import torch
+import torch.nn.functional as F
+from model_utils import INT8_FORMATS, load_yolo, predict_args
 
-def main(source=0, model_path='yolov8n-face.pt', conf_threshold=0.5):
+def open_source(source, hw_decode=True):
+    """
+    Open a video source, decoding files and streams on the GPU/iGPU when possible
+    
+    Args:
+        source: Webcam index, or path/URL of a video file or stream
+        hw_decode: Ask FFmpeg for hardware decoding (NVDEC, VA-API, D3D11, ...)
+    """
+    # Webcams deliver raw or MJPEG frames, there's no video codec to offload
+    if hw_decode and isinstance(source, str) and hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+        # ACCELERATION_ANY uses whatever decoder the platform has and falls back to the CPU
+        cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG, [
+            cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY
+        ])
+        if cap.isOpened():
+            return cap
+        print("Hardware decoding unavailable, using software decoding")
+    return cv2.VideoCapture(source)
+
+class GPUResizer:
+    """
+    Resize frames on the GPU into a persistent model input tensor
+    
+    Ultralytics letterboxes every numpy frame on the CPU; tensors are used as
+    given. Frames are uploaded as uint8 (a quarter of the float bytes), then
+    converted to RGB, resized and scaled to 0-1 on the device. Boxes come back
+    in input coordinates, so callers scale them by `scale` to get frame pixels.
+    """
+    
+    def __init__(self, frame_shape, imgsz=640, batch_size=1, half=True):
+        height, width = frame_shape[:2]
+        # Longest side to imgsz, both sides rounded to the model stride
+        ratio = imgsz / max(height, width)
+        self.size = (max(32, round(height * ratio / 32) * 32), max(32, round(width * ratio / 32) * 32))
+        self.scale = (width / self.size[1], height / self.size[0])
+        self.frame_shape = frame_shape
+        
+        dtype = torch.float16 if half else torch.float32
+        self._upload = torch.empty((batch_size, height, width, 3), dtype=torch.uint8, device='cuda')
+        self._input = torch.empty((batch_size, 3) + self.size, dtype=dtype, device='cuda')
+    
+    def __call__(self, frames):
+        """Return the (N, 3, H, W) RGB input tensor for a list of same-sized BGR frames"""
+        n = len(frames)
+        for slot, frame in zip(self._upload, frames):
+            slot.copy_(torch.from_numpy(frame))
+        # NHWC BGR -> NCHW RGB, resized like letterbox's INTER_LINEAR
+        batch = self._upload[:n].permute(0, 3, 1, 2).flip(1).to(self._input.dtype)
+        resized = F.interpolate(batch, size=self.size, mode='bilinear', align_corners=False)
+        return self._input[:n].copy_(resized).div_(255)
+
+def draw_detections(frame, result, names, scale=(1.0, 1.0)):
+    """Draw a result's boxes onto frame in place and return how many there were"""
+    # Drawing straight onto the captured frame; result.plot() would copy it first
+    boxes = result.boxes
+    xyxy = boxes.xyxy.cpu().numpy()
+    xyxy[:, 0::2] *= scale[0]
+    xyxy[:, 1::2] *= scale[1]
+    xyxy = xyxy.astype(int).tolist()
+    confs = boxes.conf.cpu().numpy().tolist()
+    classes = boxes.cls.cpu().numpy().astype(int).tolist()
+    for (x1, y1, x2, y2), conf, cls in zip(xyxy, confs, classes):
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, f"{names[cls]} {conf:.2f}", (x1, max(y1 - 5, 15)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    return len(xyxy)
+
+def main(source=0, model_path='yolov8n-face.pt', conf_threshold=0.5, hw_decode=True, batch_size=1,
+         export_format=None, int8=False, calibration_data=None, gpu_resize=False):
     """
     Run YOLOv8 face detection on video source
     
@@ -14,16 +85,33 @@ def main(source=0, model_path='yolov8n-face.pt', conf_threshold=0.5):
         source: Video source (0 for webcam, or path to video file)
         model_path: Path to YOLO model weights
         conf_threshold: Confidence threshold for detections
+        hw_decode: Decode video files/streams in hardware when available
+        batch_size: Frames per inference call (>1 trades latency for throughput on video files)
+        export_format: Run through a one-time export ("engine" for TensorRT, "openvino" for CPU)
+        int8: Quantize the export to INT8
+        calibration_data: Dataset YAML whose images calibrate INT8
+        gpu_resize: Resize frames on the GPU instead of letting Ultralytics do it on the CPU
     """
+    # FP16 on CUDA (FP32 on CPU); exports are built at the matching precision
+    inference_args = predict_args()
+    
     print(f"Loading model: {model_path}")
     try:
-        model = YOLO(model_path)
+        # Exports default to batch 1, so build them for the frame batch we send
+        model = load_yolo(model_path, export_format, half=bool(inference_args),
+                          int8=int8, data=calibration_data, batch=batch_size)
     except Exception as e:
         print(f"Error loading model: {e}")
         print("Trying to download YOLOv8n model instead...")
         model = YOLO('yolov8n.pt') 
     
-    cap = cv2.VideoCapture(source)
+    cap = open_source(source, hw_decode)
+    
+    # Exports are built for a fixed square input, so only the PyTorch model takes resized tensors
+    if gpu_resize and (export_format or not torch.cuda.is_available()):
+        print("GPU resize needs CUDA and a PyTorch model, resizing on the CPU")
+        gpu_resize = False
+    resizer = None
     
     if not cap.isOpened():
         print(f"Error: Cannot open video source {source}")
@@ -39,29 +127,52 @@ def main(source=0, model_path='yolov8n-face.pt', conf_threshold=0.5):
     print("\nPress 'q' to quit, 's' to save screenshot")
     
     frame_count = 0
+    pending = []
+    running = True
     
-    while cap.isOpened():
+    while running and cap.isOpened():
         ret, frame = cap.read()
         
-        if not ret:
+        if ret:
+            pending.append(frame)
+        else:
             print("End of video or cannot read frame")
+        
+        # Keep reading until the batch is full; a short last batch still gets processed
+        if ret and len(pending) < batch_size:
+            continue
+        if not pending:
             break
         
-        results = model(frame, conf=conf_threshold, verbose=False)
-        annotated_frame = results[0].plot()
-        frame_count += 1
-        info_text = f"Frame: {frame_count} | Detections: {len(results[0].boxes)}"
-        cv2.putText(annotated_frame, info_text, (10, 30), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        cv2.imshow('YOLOv8 Face Detection', annotated_frame)
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            print("Quitting...")
+        # One forward pass for the whole batch
+        scale = (1.0, 1.0)
+        if gpu_resize:
+            if resizer is None or resizer.frame_shape != pending[0].shape:
+                resizer = GPUResizer(pending[0].shape, batch_size=batch_size, half=bool(inference_args))
+            results = model(resizer(pending), conf=conf_threshold, verbose=False, **inference_args)
+            scale = resizer.scale
+        else:
+            results = model(pending, conf=conf_threshold, verbose=False, **inference_args)
+        for annotated_frame, result in zip(pending, results):
+            num_detections = draw_detections(annotated_frame, result, model.names, scale)
+            frame_count += 1
+            info_text = f"Frame: {frame_count} | Detections: {num_detections}"
+            cv2.putText(annotated_frame, info_text, (10, 30), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.imshow('YOLOv8 Face Detection', annotated_frame)
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                print("Quitting...")
+                running = False
+                break
+            elif key == ord('s'):
+                screenshot_name = f"face_detection_{frame_count}.jpg"
+                cv2.imwrite(screenshot_name, annotated_frame)
+                print(f"Screenshot saved: {screenshot_name}")
+        pending = []
+        
+        if not ret:
             break
-        elif key == ord('s'):
-            screenshot_name = f"face_detection_{frame_count}.jpg"
-            cv2.imwrite(screenshot_name, annotated_frame)
-            print(f"Screenshot saved: {screenshot_name}")
     
     cap.release()
     cv2.destroyAllWindows()
@@ -75,7 +186,23 @@ if __name__ == "__main__":
                         help='Path to YOLO model weights')
     parser.add_argument('--conf', type=float, default=0.5,
                         help='Confidence threshold (0-1)')
+    parser.add_argument('--sw-decode', action='store_true',
+                        help='Disable hardware video decoding')
+    parser.add_argument('--batch', type=int, default=1,
+                        help='Frames per inference batch (e.g. 4 for video files)')
+    parser.add_argument('--export', type=str, default=None, choices=['engine', 'openvino', 'onnx'],
+                        help='Export the model once and run the export (engine = TensorRT)')
+    parser.add_argument('--int8', action='store_true',
+                        help='Quantize the export to INT8')
+    parser.add_argument('--data', type=str, default='face_dataset.yaml',
+                        help='Calibration dataset for --int8')
+    parser.add_argument('--gpu-resize', action='store_true',
+                        help='Resize frames on the GPU (CUDA, PyTorch model only)')
     args = parser.parse_args()
+    if args.int8 and args.export not in INT8_FORMATS:
+        parser.error(f"--int8 needs --export {' or '.join(sorted(INT8_FORMATS))}")
     source = int(args.source) if args.source.isdigit() else args.source
     
-    main(source=source, model_path=args.model, conf_threshold=args.conf)
\ No newline at end of file
+    main(source=source, model_path=args.model, conf_threshold=args.conf, hw_decode=not args.sw_decode,
+         batch_size=max(1, args.batch), export_format=args.export, int8=args.int8,
+         calibration_data=args.data, gpu_resize=args.gpu_resize)
\ No newline at end of file